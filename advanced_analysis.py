@@ -1,38 +1,61 @@
 # advanced_analysis.py
-import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from scipy.stats import shapiro
+from __future__ import annotations
+
 import streamlit as st
-import plotly.express as px
+
+import parallel_stats
+import sketches
+from column_catalog import column_picker
+from column_profile import DatasetProfile
+from data_preview import show_paged_preview
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+sns = lazy_module("seaborn")
+plt = lazy_module("matplotlib.pyplot")
+px = lazy_module("plotly.express")
+scipy_stats = lazy_module("scipy.stats")
 
 # -----------------------------
 # Core analysis utilities
 # -----------------------------
 
-def statistical_summary(df: pd.DataFrame) -> pd.DataFrame:
-    """Return descriptive stats plus skewness & kurtosis for numeric columns."""
-    num_df = df.select_dtypes(include=["int64", "float64"])
-    desc = num_df.describe().T
-    desc["skewness"] = num_df.skew()
-    desc["kurtosis"] = num_df.kurtosis()
+SUMMARY_COLUMNS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max", "skewness", "kurtosis"]
+
+def _numeric_columns(df: pd.DataFrame) -> list:
+    return [c for c, dtype in df.dtypes.items() if dtype in ("int64", "float64")]
+
+def _summary_row(name, series: pd.Series) -> list:
+    q25, q50, q75 = series.quantile([0.25, 0.5, 0.75])
+    return [series.count(), series.mean(), series.std(), series.min(), q25, q50, q75, series.max(),
+            series.skew(), series.kurtosis()]
+
+def statistical_summary(df: pd.DataFrame, workers: int = None) -> pd.DataFrame:
+    """Return descriptive stats plus skewness & kurtosis for numeric columns.
+
+    Columns are summarized in parallel (see parallel_stats); `workers`
+    overrides EDA_STAT_WORKERS.
+    """
+    numeric_cols = _numeric_columns(df)
+    rows = parallel_stats.map_columns(df, numeric_cols, _summary_row, workers)
+    desc = pd.DataFrame(rows, index=numeric_cols, columns=SUMMARY_COLUMNS)
+    desc["count"] = desc["count"].astype(float)
     return desc
 
-def normality_test(df: pd.DataFrame) -> pd.DataFrame:
+def _shapiro_row(c, series: pd.Series) -> list:
+    series = series.dropna()
+    if len(series) < 3:
+        return [c, None, None]
+    try:
+        stat, p = scipy_stats.shapiro(series)
+        return [c, float(stat), float(p)]
+    except Exception:
+        return [c, None, None]
+
+def normality_test(df: pd.DataFrame, workers: int = None) -> pd.DataFrame:
     """Run Shapiro-Wilk test for numeric columns (returns statistic and p-value)."""
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns
-    rows = []
-    for c in numeric_cols:
-        series = df[c].dropna()
-        if len(series) < 3:
-            rows.append([c, None, None])
-            continue
-        try:
-            stat, p = shapiro(series)
-            rows.append([c, float(stat), float(p)])
-        except Exception:
-            rows.append([c, None, None])
+    rows = parallel_stats.map_columns(df, _numeric_columns(df), _shapiro_row, workers)
     return pd.DataFrame(rows, columns=["Column", "Shapiro Statistic", "p-value"])
 
 def correlation_matrix(df: pd.DataFrame) -> pd.DataFrame:
@@ -80,8 +103,8 @@ def duplicate_rows_report(df: pd.DataFrame) -> pd.DataFrame:
 # -----------------------------
 # these are the functions main.py expects to call
 
-def show_statistical_summary(df: pd.DataFrame):
-    """Render statistical summary and normality tests in Streamlit."""
+def show_statistical_summary(df: pd.DataFrame, profile=None):
+    """Render statistical summary, normality tests and the sketch summary in Streamlit."""
     if df is None:
         st.warning("No dataset loaded.")
         return
@@ -93,7 +116,13 @@ def show_statistical_summary(df: pd.DataFrame):
         st.write("Note: Shapiro-Wilk requires at least 3 non-null observations per column.")
         st.dataframe(normality_test(df))
 
-def show_correlation_analysis(df: pd.DataFrame):
+    with st.expander("One-pass sketch summary (approximate)"):
+        st.write("Quantiles within about 1.65% rank error, distinct counts within about 0.8%, "
+                 "top counts are lower bounds (see sketches.py).")
+        if profile is not None and st.toggle("Compute sketch summary", key="sketch_summary"):
+            st.dataframe(sketches.sketch_summary({col: profile.sketch(df, col) for col in df.columns}))
+
+def show_correlation_analysis(df: pd.DataFrame, profile=None):
     """Render correlation heatmap, pairplot selection, and categorical-vs-numerical tool."""
     if df is None:
         st.warning("No dataset loaded.")
@@ -108,8 +137,10 @@ def show_correlation_analysis(df: pd.DataFrame):
 
     # Pairplot selection
     st.markdown("**Pairplot (select numeric columns)**")
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-    chosen = st.multiselect("Select numeric columns (>=2)", numeric_cols, default=numeric_cols[:3])
+    catalog = (profile or DatasetProfile()).catalog(df)
+    first_numeric = catalog.names(catalog.search(numeric=True), limit=3)
+    chosen = column_picker("Select numeric columns (>=2)", catalog, key="pairplot_cols", numeric=True,
+                           default=first_numeric)
     if len(chosen) >= 2:
         try:
             fig_pp = pairplot(df, chosen)
@@ -119,10 +150,9 @@ def show_correlation_analysis(df: pd.DataFrame):
 
     # Categorical vs numerical
     st.markdown("**Categorical vs Numerical**")
-    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-    if cat_cols and numeric_cols:
-        cat = st.selectbox("Categorical column", cat_cols)
-        num = st.selectbox("Numeric column", numeric_cols)
+    if len(catalog.search(text=True)) and first_numeric:
+        cat = column_picker("Categorical column", catalog, key="bivariate_cat_col", multi=False, text=True)
+        num = column_picker("Numeric column", catalog, key="bivariate_num_col", multi=False, numeric=True)
         fig_box = numerical_vs_categorical(df, cat, num)
         st.pyplot(fig_box)
     else:
@@ -153,5 +183,5 @@ def show_missing_value_report(df: pd.DataFrame):
     if dup.empty:
         st.info("No duplicate rows found.")
     else:
-        st.write(f"Found {len(dup)} duplicated rows (showing sample):")
-        st.dataframe(dup.head(200))
+        st.write(f"Found {len(dup)} duplicated rows:")
+        show_paged_preview(dup, key="duplicate_rows")
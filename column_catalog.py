@@ -0,0 +1,180 @@
+# column_catalog.py
+'''Searchable catalog of the columns of one dataset version.
+
+The catalog is built once per version from the column profile and holds the
+name, dtype, role (categorical/numerical/datetime, same rule as categorical_numerical),
+null rate and cardinality of every column, plus whether it is numeric or
+text (object, string or categorical, whichever dtype name the installed
+pandas uses). Searches use a trigram index over the lower-cased names plus
+per-dtype and per-role position lists, and results are returned a page at a
+time, so column pickers and overview tables never ship every column name of
+a very wide dataset to the browser.
+'''
+from __future__ import annotations
+
+import math
+import re
+
+import streamlit as st
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+PAGE_SIZE = 50
+
+# Most options a column picker offers at once; the filter box narrows the rest.
+MAX_OPTIONS = 200
+
+CATALOG_COLUMNS = ["Column", "Data Type", "Role", "Null %", "Distinct"]
+
+
+def is_text_dtype(dtype) -> bool:
+    """Object, string and categorical dtypes: the columns that can be encoded."""
+    return (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype))
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ColumnCatalog:
+    """Column metadata with indexed substring/regex/dtype/role search."""
+
+    def __init__(self, table: pd.DataFrame, numeric: np.ndarray, text: np.ndarray):
+        self.table = table.reset_index(drop=True)
+        self.numeric = np.asarray(numeric, dtype=bool)
+        self.text = np.asarray(text, dtype=bool)
+        self._lower = self.table["Column"].astype(str).str.lower()
+        self._by_dtype = self._positions(self.table["Data Type"])
+        self._by_role = self._positions(self.table["Role"])
+
+        trigram_positions = {}
+        for position, name in enumerate(self._lower):
+            for trigram in _trigrams(name):
+                trigram_positions.setdefault(trigram, []).append(position)
+        self._by_trigram = {trigram: np.array(positions) for trigram, positions in trigram_positions.items()}
+
+    @staticmethod
+    def _positions(values: pd.Series) -> dict:
+        return {key: np.asarray(positions) for key, positions in values.groupby(values).indices.items()}
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, profile) -> "ColumnCatalog":
+        profile.prepare(df)
+        rows, numeric, text = [], [], []
+        for col in df.columns:
+            stats = profile.columns[col]
+            role = "datetime" if stats.datetime else "categorical" if stats.categorical else "numerical"
+            null_rate = stats.missing / stats.rows * 100 if stats.rows else 0.0
+            rows.append([col, str(stats.dtype), role, round(null_rate, 2), stats.nunique])
+            numeric.append(stats.numeric)
+            text.append(is_text_dtype(stats.dtype))
+        return cls(pd.DataFrame(rows, columns=CATALOG_COLUMNS), numeric, text)
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def dtypes(self) -> list:
+        return sorted(self._by_dtype)
+
+    def search(self, query: str = "", regex: bool = False, dtypes=None, role=None, numeric=None,
+               text=None) -> np.ndarray:
+        """Return the positions of the matching columns, in column order.
+
+        Raises re.error for an invalid regular expression.
+        """
+        positions = np.arange(len(self.table))
+        if dtypes:
+            positions = np.intersect1d(positions, np.concatenate(
+                [self._by_dtype.get(dtype, np.array([], dtype=int)) for dtype in dtypes]))
+        if role:
+            positions = np.intersect1d(positions, self._by_role.get(role, np.array([], dtype=int)))
+        if numeric is not None:
+            positions = positions[self.numeric[positions] == numeric]
+        if text is not None:
+            positions = positions[self.text[positions] == text]
+
+        if query and regex:
+            pattern = re.compile(query, re.IGNORECASE)
+            names = self.table["Column"].astype(str).to_numpy()[positions]
+            positions = positions[np.array([bool(pattern.search(name)) for name in names], dtype=bool)]
+        elif query:
+            query = query.lower()
+            for trigram in _trigrams(query):
+                positions = np.intersect1d(positions, self._by_trigram.get(trigram, np.array([], dtype=int)),
+                                           assume_unique=True)
+            # Trigrams only narrow the candidates; confirm the full substring.
+            names = self._lower.to_numpy()[positions]
+            positions = positions[np.array([query in name for name in names], dtype=bool)]
+        return positions
+
+    def names(self, positions: np.ndarray, limit: int = None) -> list:
+        positions = positions if limit is None else positions[:limit]
+        return self.table["Column"].to_numpy()[positions].tolist()
+
+    def page(self, positions: np.ndarray, page: int, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+        """Return one page (0-based) of catalog rows for the given positions."""
+        start = page * page_size
+        return self.table.iloc[positions[start:start + page_size]]
+
+
+# -----------------------------
+# Streamlit widgets
+# -----------------------------
+
+def show_column_catalog(catalog: ColumnCatalog, key: str, role: str = None):
+    """Render a searchable, paged catalog table."""
+    query = st.text_input("Search columns", key=f"{key}_query")
+    regex = st.checkbox("Regular expression", key=f"{key}_regex")
+    dtypes = st.multiselect("Data types", catalog.dtypes, key=f"{key}_dtypes")
+    try:
+        positions = catalog.search(query, regex, dtypes, role)
+    except re.error as e:
+        st.error(f"Invalid regular expression: {e}")
+        return
+
+    pages = max(1, math.ceil(len(positions) / PAGE_SIZE))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    st.caption(f"{len(positions)} matching columns")
+    st.dataframe(catalog.page(positions, page - 1), hide_index=True)
+
+
+def column_picker(label: str, catalog: ColumnCatalog, key: str, multi: bool = True,
+                  dtypes=None, role: str = None, numeric=None, text=None, default=None):
+    """Multiselect (or selectbox) over the catalog.
+
+    Only up to MAX_OPTIONS matching names are sent as options; wider datasets
+    get a filter box to narrow them. The current selection stays available as
+    long as the column still matches.
+    """
+    query = ""
+    if len(catalog) > MAX_OPTIONS:
+        query = st.text_input(f"Filter: {label}", key=f"{key}_filter", placeholder="Type to filter columns")
+    positions = catalog.search(query, dtypes=dtypes, role=role, numeric=numeric, text=text)
+    options = catalog.names(positions, limit=MAX_OPTIONS)
+    if len(positions) > MAX_OPTIONS:
+        st.caption(f"Showing {MAX_OPTIONS} of {len(positions)} matching columns, refine the filter to see more.")
+
+    # Drop selections that no longer match, e.g. a column that was encoded or renamed.
+    allowed = set(catalog.names(catalog.search(dtypes=dtypes, role=role, numeric=numeric, text=text)))
+    if key not in st.session_state and default is not None:
+        st.session_state[key] = default
+    if multi:
+        if key in st.session_state:
+            st.session_state[key] = [name for name in st.session_state[key] if name in allowed]
+        selected = st.session_state.get(key, [])
+    else:
+        if st.session_state.get(key) not in allowed:
+            st.session_state.pop(key, None)
+        selected = [st.session_state[key]] if key in st.session_state else []
+    options += [name for name in selected if name not in options]
+
+    if multi:
+        return st.multiselect(label, options, key=key)
+    return st.selectbox(label, options, key=key)
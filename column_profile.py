@@ -0,0 +1,319 @@
+# column_profile.py
+'''Per-column statistics that survive preprocessing steps.
+
+A DatasetProfile belongs to one dataset version and caches one ColumnStats per
+column, computed lazily the first time a summary needs it. When a preprocessing
+step creates a new version, the profile is derived from the previous one:
+
+- columns the step declares as changed (or whose dtype changed) are dropped
+  and re-profiled on demand,
+- renamed columns keep their statistics under the new name,
+- for row-removing steps (drop rows, outlier removal, drop duplicates) the
+  counts, missing values, mean/variance and small value-count tables are
+  updated by subtracting the removed rows; quantiles, and min/max or distinct
+  counts the removed rows may have affected, are recomputed lazily.
+
+The profile also caches group-by cubes and crosstabs per column pair, so charts
+that switch aggregation or chart type reuse one aggregation pass, and the
+mergeable column sketches (see sketches.py) that replace exact quantiles for
+frames of at least SKETCH_MIN_ROWS rows, and the version checksums used to
+compare versions (see version_diff.py).
+'''
+from __future__ import annotations
+
+import copy
+
+import parallel_stats
+from lazy_imports import lazy_module
+from sketches import SKETCH_MIN_ROWS, is_numeric_column, sketch_series
+from time_series import time_order
+from version_diff import VersionChecksums
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+# Columns with at most this many distinct values keep their value counts,
+# which makes distinct counts exact after rows are removed.
+VALUE_COUNTS_LIMIT = 1000
+
+# Same rule categorical_numerical has always used.
+CATEGORICAL_MAX_UNIQUE = 30
+
+QUANTILES = [0.25, 0.5, 0.75]
+
+CUBE_AGGREGATIONS = ["count", "sum", "mean", "min", "max", "25%", "50%", "75%"]
+
+
+class ColumnStats:
+    """Statistics of one column; fields set to None are stale and recomputed on demand."""
+
+    def __init__(self, series: pd.Series):
+        self.dtype = series.dtype
+        self.rows = len(series)
+        self.count = int(series.count())
+        self.missing = self.rows - self.count
+        self.numeric = is_numeric_column(series)
+        self.datetime = pd.api.types.is_datetime64_any_dtype(series)
+
+        counts = series.value_counts(dropna=False)
+        self.nunique = len(counts)
+        self.value_counts = counts if len(counts) <= VALUE_COUNTS_LIMIT else None
+
+        self.mean = self.m2 = self.min = self.max = None
+        self.quantiles = None
+        if self.numeric:
+            values = series.dropna()
+            self._set_moments(values)
+            self.min = values.min() if self.count else np.nan
+            self.max = values.max() if self.count else np.nan
+
+    def _set_moments(self, values):
+        self.mean = float(values.mean()) if self.count else np.nan
+        self.m2 = float(values.var(ddof=0)) * self.count if self.count else 0.0
+
+    def refresh(self, series: pd.Series):
+        """Recompute the stale fields, except quantiles which describe() fills in."""
+        if self.nunique is None:
+            self.nunique = int(series.nunique(dropna=False))
+        if self.numeric and (self.mean is None or self.min is None or self.max is None):
+            values = series.dropna()
+            if self.mean is None:
+                self._set_moments(values)
+            if self.min is None:
+                self.min = values.min() if self.count else np.nan
+            if self.max is None:
+                self.max = values.max() if self.count else np.nan
+        return self
+
+    def without_rows(self, removed: pd.Series) -> "ColumnStats":
+        """Return the statistics after `removed` rows were taken out of the column."""
+        stats = copy.copy(self)
+        removed_count = int(removed.count())
+        stats.rows = self.rows - len(removed)
+        stats.count = self.count - removed_count
+        stats.missing = stats.rows - stats.count
+        stats.quantiles = None
+
+        if self.value_counts is not None:
+            counts = self.value_counts.sub(removed.value_counts(dropna=False), fill_value=0)
+            counts = counts[counts > 0].astype("int64")
+            stats.value_counts = counts
+            stats.nunique = len(counts)
+        else:
+            stats.nunique = None
+
+        if self.numeric and removed_count:
+            values = removed.dropna()
+            if stats.count == 0:
+                stats.mean, stats.m2 = np.nan, 0.0
+            elif self.mean is not None:
+                # Chan et al. pairwise update, solved for the remaining part.
+                mean_b = float(values.mean())
+                m2_b = float(values.var(ddof=0)) * removed_count
+                mean_a = (self.count * self.mean - removed_count * mean_b) / stats.count
+                delta = mean_b - mean_a
+                m2_a = self.m2 - m2_b - delta * delta * stats.count * removed_count / self.count
+                if m2_a < 0:
+                    # Cancellation error: fall back to a recompute.
+                    stats.mean = None
+                else:
+                    stats.mean, stats.m2 = mean_a, m2_a
+            if self.min is not None and values.min() <= self.min:
+                stats.min = None
+            if self.max is not None and values.max() >= self.max:
+                stats.max = None
+        return stats
+
+    @property
+    def categorical(self) -> bool:
+        if self.datetime:
+            return False
+        return self.nunique <= CATEGORICAL_MAX_UNIQUE or self.dtype == np.object_
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return np.nan
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+    def describe(self, series: pd.Series) -> list:
+        """Return the values of DataFrame.describe() for a numeric column."""
+        if self.quantiles is None:
+            values = series.dropna()
+            self.quantiles = values.quantile(QUANTILES).tolist() if self.count else [np.nan] * len(QUANTILES)
+        return [self.count, self.mean, self.std, self.min, *self.quantiles, self.max]
+
+    def counts(self, dropna=True):
+        """Return value counts sorted like Series.value_counts, or None if not kept."""
+        if self.value_counts is None:
+            return None
+        counts = self.value_counts
+        if dropna:
+            counts = counts[counts.index.notna()]
+        return counts.sort_values(ascending=False, kind="stable")
+
+
+class DatasetProfile:
+    """Lazily filled ColumnStats for every column of one dataset version."""
+
+    def __init__(self, sketches=None, checksums=None):
+        self.columns = {}
+        self.sketches = dict(sketches or {})  # column -> sketches.ColumnSketch
+        self.groups = {}  # (kind, column, column) -> aggregated frame
+        self.checksums = checksums or VersionChecksums()  # see version_diff.py
+        self._catalog = None
+
+    def column(self, df: pd.DataFrame, name) -> ColumnStats:
+        stats = self.columns.get(name)
+        if stats is None:
+            stats = self.columns[name] = ColumnStats(df[name])
+        return stats.refresh(df[name])
+
+    def prepare(self, df: pd.DataFrame, columns=None):
+        """Compute the statistics of many columns at once, in parallel for wide frames."""
+        columns = df.columns if columns is None else columns
+
+        def compute(name, series):
+            stats = self.columns.get(name)
+            return (stats or ColumnStats(series)).refresh(series)
+
+        for name, stats in zip(columns, parallel_stats.map_columns(df, columns, compute)):
+            self.columns[name] = stats
+
+    def derive(self, old_df, new_df, columns=None, renamed=None, rows=False) -> "DatasetProfile":
+        """Return the profile of `new_df`, produced from `old_df` by a preprocessing step.
+
+        `columns` are the columns the step modified, `renamed` maps old to new
+        names, and `rows` says the step removed rows without changing values.
+        A step that declares none of these starts a fresh profile.
+        """
+        profile = DatasetProfile()
+        profile.checksums = self.checksums.derive(old_df, new_df, columns, renamed, rows)
+        if not (columns or renamed or rows):
+            return profile
+
+        carried = {(renamed or {}).get(name, name): stats for name, stats in self.columns.items()}
+        for name in columns or []:
+            carried.pop(name, None)
+
+        if rows:
+            removed = _removed_rows(old_df, new_df)
+            if removed is None:
+                return profile
+            for name, stats in list(carried.items()):
+                carried[name] = stats.without_rows(removed[name]) if len(removed) else stats
+
+        for name, stats in carried.items():
+            if name in new_df.columns and new_df[name].dtype == stats.dtype:
+                profile.columns[name] = stats
+
+        if not rows:
+            for name, sketch in self.sketches.items():
+                name = (renamed or {}).get(name, name)
+                if name in profile.columns:
+                    profile.sketches[name] = sketch
+            for (kind, first, second), table in self.groups.items():
+                first, second = (renamed or {}).get(first, first), (renamed or {}).get(second, second)
+                if first in profile.columns and second in profile.columns:
+                    profile.groups[(kind, first, second)] = table
+        return profile
+
+    # ---- tables used by the summaries ----
+
+    def missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.prepare(df)
+        missing = pd.Series({col: self.column(df, col).missing for col in df.columns}, dtype="int64")
+        return pd.DataFrame({'Missing Count': missing, 'Missing Percentage': (missing / len(df)) * 100})
+
+    def describe(self, df: pd.DataFrame, columns) -> pd.DataFrame:
+        self.prepare(df, columns)
+        numeric = [col for col in columns if self.columns[col].numeric]
+        if len(df) >= SKETCH_MIN_ROWS:
+            for col in numeric:
+                self.quartiles(df, col)
+        rows = parallel_stats.map_columns(df, numeric, lambda col, series: self.columns[col].describe(series))
+        data = dict(zip(numeric, rows))
+        return pd.DataFrame(data, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], columns=numeric)
+
+    def dtypes(self, df: pd.DataFrame) -> pd.Series:
+        self.prepare(df)
+        return pd.Series({col: self.column(df, col).dtype for col in df.columns}, dtype=object)
+
+    def sketch(self, df: pd.DataFrame, name):
+        """Return the ColumnSketch of a column, sketching it now if needed."""
+        if name not in self.sketches:
+            self.sketches[name] = sketch_series(df[name])
+        return self.sketches[name]
+
+    def quartiles(self, df: pd.DataFrame, name) -> list:
+        """Return the 25/50/75% quantiles, from the sketch for frames of SKETCH_MIN_ROWS rows or more."""
+        stats = self.column(df, name)
+        if stats.quantiles is None and len(df) >= SKETCH_MIN_ROWS and self.sketch(df, name).numeric:
+            stats.quantiles = self.sketch(df, name).quantiles.quantiles(QUANTILES)
+        stats.describe(df[name])
+        return stats.quantiles
+
+    def catalog(self, df: pd.DataFrame):
+        """Return the ColumnCatalog of this version, built on first use."""
+        if self._catalog is None:
+            from column_catalog import ColumnCatalog
+            self._catalog = ColumnCatalog.build(df, self)
+        return self._catalog
+
+    def cube(self, df: pd.DataFrame, cat_column, num_column) -> pd.DataFrame:
+        """Return count/sum/mean/min/max/quartiles of `num_column` per category, cached."""
+        key = ("cube", cat_column, num_column)
+        if key not in self.groups:
+            self.groups[key] = groupby_cube(df, cat_column, num_column)
+        return self.groups[key]
+
+    def crosstab(self, df: pd.DataFrame, first, second) -> pd.DataFrame:
+        """Return the row counts of every (first, second) category pair, cached."""
+        key = ("crosstab", first, second)
+        if key not in self.groups:
+            self.groups[key] = pd.crosstab(df[first].astype(object).fillna("NaN"),
+                                           df[second].astype(object).fillna("NaN"))
+        return self.groups[key]
+
+    def time_order(self, df: pd.DataFrame, name):
+        """Return the sorted timestamps of a datetime column and their row positions, cached."""
+        key = ("time_order", name, name)
+        if key not in self.groups:
+            self.groups[key] = time_order(df[name])
+        return self.groups[key]
+
+    def datetime_columns(self, df: pd.DataFrame) -> list:
+        self.prepare(df)
+        return [col for col in df.columns if self.columns[col].datetime]
+
+    def categorical_numerical(self, df: pd.DataFrame):
+        """Split the columns into numerical and categorical ones; datetime columns are in neither."""
+        self.prepare(df)
+        num_columns, cat_columns = [], []
+        for col in df.columns:
+            if self.columns[col].datetime:
+                continue
+            if self.columns[col].categorical:
+                cat_columns.append(col.strip())
+            else:
+                num_columns.append(col.strip())
+        return num_columns, cat_columns
+
+
+def groupby_cube(df: pd.DataFrame, cat_column, num_column) -> pd.DataFrame:
+    """Aggregate a numeric column per category in one group-by pass."""
+    grouped = df.groupby(cat_column, dropna=False, observed=True)[num_column]
+    cube = grouped.agg(["count", "sum", "mean", "min", "max"])
+    quartiles = grouped.quantile(QUANTILES).unstack()
+    quartiles.columns = ["25%", "50%", "75%"]
+    return cube.join(quartiles)[CUBE_AGGREGATIONS]
+
+
+def _removed_rows(old_df, new_df):
+    """Return the rows of old_df missing from new_df, or None if new_df is not a row subset."""
+    if old_df is None or not old_df.index.is_unique:
+        return None
+    removed = old_df.loc[old_df.index.difference(new_df.index)]
+    if len(old_df) - len(removed) != len(new_df) or not new_df.columns.equals(old_df.columns):
+        return None
+    return removed
@@ -3,52 +3,84 @@ This is so as to reduce the clutter in the main file and isolate the core functi
 '''
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from collections import Counter
-import plotly.express as px
+from lazy_imports import lazy_module
+from column_profile import CUBE_AGGREGATIONS, DatasetProfile
+import parallel_stats
+import sketches
+import multi_ingest
+import time_series
+from column_catalog import column_picker, show_column_catalog
+from data_preview import show_paged_preview
+
+# Heavy libraries are imported on first use, see lazy_imports.py
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+plt = lazy_module("matplotlib.pyplot")
+sns = lazy_module("seaborn")
+px = lazy_module("plotly.express")
+go = lazy_module("plotly.graph_objects")
+
+# Categorical charts show this many categories by default and fold the rest into "Other"
+DEFAULT_TOP_N = 20
 
 # Function to load the csv data to a dataframe
-def load_data(file):
-    return pd.read_csv(file)
+# Also accepts a list of files or a glob pattern such as "data/2024-*.csv"; those are
+# parsed in parallel and concatenated or joined on `key` (see multi_ingest.load_many).
+# Text columns holding dates are parsed into datetimes (see time_series.py)
+def load_data(file, **options):
+    if multi_ingest.is_many(file):
+        df = multi_ingest.load_many(file, **options)[0]
+    else:
+        df = pd.read_csv(file)
+    time_series.convert_datetime_columns(df)
+    return df
+
+# Function to load the csv data chunk by chunk, sketching every column while it streams in
+def load_data_with_sketches(file, **options):
+    if multi_ingest.is_many(file):
+        df, column_sketches = multi_ingest.load_many(file, **options)
+    else:
+        df, column_sketches = sketches.read_csv_sketched(file)
+    # Sketches of the text form of parsed date columns no longer apply
+    for column in time_series.convert_datetime_columns(df):
+        (column_sketches or {}).pop(column, None)
+    return df, column_sketches
 
 # Function to find categorical and numerical columns/variables in dataset
-def categorical_numerical(df):
-    num_columns,cat_columns = [],[]
-    for col in df.columns:
-        if len(df[col].unique()) <= 30 or df[col].dtype== np.object_:
-            cat_columns.append(col.strip())
-
-        else:
-            num_columns.append(col.strip())
-
-    return num_columns,cat_columns
+# The profile caches per-column statistics between reruns and preprocessing steps;
+# without one a throwaway profile computes them from scratch.
+def categorical_numerical(df,profile=None):
+    profile = profile or DatasetProfile()
+    return profile.categorical_numerical(df)
 
 
 # Function to display dataset overview
-def display_dataset_overview(df,cat_columns,num_columns):
-    
-    display_rows = st.slider("Display Rows", 1, len(df), len(df) if len(df) < 20 else 20)
+# `table` is the dataset as an Arrow table (see dataset_manager.current_arrow_table) and
+# `token` identifies its version; without a table the preview converts only the rows it shows
+def display_dataset_overview(df,cat_columns,num_columns,profile=None,table=None,token=None):
+    profile = profile or DatasetProfile()
 
-    st.write(df.head(display_rows))
+    show_paged_preview(table if table is not None else df, key="overview_preview", token=token)
 
     st.subheader("2. Dataset Overview")
     st.write(f"**Rows:** {df.shape[0]}")
     st.write(f"**Columns:** {df.shape[1]}")
     st.write(f"**Duplicates:** {df.shape[0] - df.drop_duplicates().shape[0]}")
     st.write(f"**Categorical Columns:** {len(cat_columns)}")
-    st.write(cat_columns)
     st.write(f"**Numerical Columns:** {len(num_columns)}")
-    st.write(num_columns)
+    st.write(f"**Datetime Columns:** {len(profile.datetime_columns(df))}")
+
+    # Paged and searchable, so wide datasets do not send every column name at once
+    catalog = profile.catalog(df)
+    role = st.radio("Show columns", ["All", "Categorical", "Numerical", "Datetime"], horizontal=True, key="overview_role")
+    show_column_catalog(catalog, key="overview_catalog", role=None if role == "All" else role.lower())
     
 
 # Function to find the missing values in the dataset
-def display_missing_values(df):
-    missing_count = df.isnull().sum()
-    missing_percentage = (missing_count / len(df)) * 100
-    missing_data = pd.DataFrame({'Missing Count': missing_count, 'Missing Percentage': missing_percentage})
+def display_missing_values(df,profile=None):
+    profile = profile or DatasetProfile()
+    missing_data = profile.missing_values(df)
     missing_data = missing_data[missing_data['Missing Count'] > 0].sort_values(by='Missing Count', ascending=False)
     if not missing_data.empty:
         st.write("Missing Data Summary:")
@@ -58,12 +90,12 @@ def display_missing_values(df):
         st.info("No Missing Value present in the Dataset")
 
 # Function to display basic statistics and visualizations about the dataset
-def display_statistics_visualization(df,cat_columns,num_columns):
+def display_statistics_visualization(df,cat_columns,num_columns,profile=None):
+    profile = profile or DatasetProfile()
     st.write("Summary Statistics for Numerical Columns")
 
     if len(num_columns)!=0:
-        num_df = df[num_columns]
-        st.write(num_df.describe())
+        st.write(profile.describe(df,num_columns))
 
     else:
         st.info("The dataset does not have any numerical columns")
@@ -72,16 +104,22 @@ def display_statistics_visualization(df,cat_columns,num_columns):
     st.write("Statistics for Categorical Columns")
     if len(cat_columns)!=0:
         num_cat_columns = st.number_input("Select the number of categorical columns to visualize:",min_value=1,max_value=len(cat_columns))
-        selected_cat_columns = st.multiselect("Select the Categorical Columns for bar chart",cat_columns,cat_columns[:num_cat_columns])
+        # Changing the number resets the selection to the first num_cat_columns columns
+        if st.session_state.get("stats_cat_columns_count") != num_cat_columns:
+            st.session_state["stats_cat_columns_count"] = num_cat_columns
+            st.session_state["stats_cat_columns"] = cat_columns[:num_cat_columns]
+        selected_cat_columns = column_picker("Select the Categorical Columns for bar chart",profile.catalog(df),key="stats_cat_columns",role="categorical",default=cat_columns[:num_cat_columns])
+
+        # Count all selected columns in parallel first, then render them in order
+        all_value_counts = parallel_stats.map_columns(df,selected_cat_columns,lambda column,series: column_value_counts(df,column,profile))
 
-        for column in selected_cat_columns:
+        for column,value_counts in zip(selected_cat_columns,all_value_counts):
             st.write(f"**{column}**")
-            value_counts = df[column].value_counts()
             st.bar_chart(value_counts)
 
             # display the value count in tabular format
             st.write(f"Value Count for {column}")
-            value_counts_table = df[column].value_counts().reset_index()
+            value_counts_table = value_counts.reset_index()
             value_counts_table.columns = ['Value','Count']
             st.write(value_counts_table)
 
@@ -89,36 +127,21 @@ def display_statistics_visualization(df,cat_columns,num_columns):
         st.info("The dataset does not have any categorical columns")
 
 # Funciton to display the datatypes
-def display_data_types(df):
-
-    data_types_df = pd.DataFrame({'Data Type':df.dtypes})
+def display_data_types(df,profile=None):
+    profile = profile or DatasetProfile()
+    data_types_df = pd.DataFrame({'Data Type':profile.dtypes(df)})
     st.write(data_types_df)
 
 # Function to search for a particular column or particular datatype in the dataset
-def search_column(df):
-    search_query = st.text_input("Search for a column:")
-
-    selected_data_type = st.selectbox("Filter by Data Type:", ['All'] + df.dtypes.unique().tolist())
-
-    # Apply filters to the DataFrame
-    filtered_df = df.copy()
-
-    # Filter by search query
-    if search_query:
-        filtered_df = filtered_df.loc[:, filtered_df.columns.str.contains(search_query, case=False)]
-
-    # Filter by data type
-    if selected_data_type != 'All':
-        filtered_df = filtered_df.select_dtypes(include=[selected_data_type])
-
-    # Display the filtered DataFrame
-    st.write(filtered_df)
+def search_column(df,profile=None):
+    profile = profile or DatasetProfile()
+    show_column_catalog(profile.catalog(df), key="search_column")
 
 
 
 ## FUNCTIONS FOR TAB2: Data Exploration and Visualization
 
-def display_individual_feature_distribution(df,num_columns):
+def display_individual_feature_distribution(df,num_columns,profile=None):
     st.subheader("Analyze Individual Feature Distribution")
     st.markdown("Here, you can explore individual numerical features, visualize their distributions, and analyze relationships between features.")
 
@@ -127,17 +150,17 @@ def display_individual_feature_distribution(df,num_columns):
         return
 
     st.write("#### Understanding Numerical Features")
-    feature = st.selectbox(label="Select Numerical Feature", options=num_columns, index=0)
-    df_description = df.describe()
+    profile = profile or DatasetProfile()
+    feature = column_picker("Select Numerical Feature", profile.catalog(df), key="distribution_feature", multi=False, role="numerical")
+    feature_stats = profile.column(df,feature)
 
     # Display summary statistics
-    null_count = df[feature].isnull().sum()
-    st.write("Count: ", df_description[feature]['count'])
-    st.write("Missing Count: ", null_count)
-    st.write("Mean: ", df_description[feature]['mean'])
-    st.write("Standard Deviation: ", df_description[feature]['std'])
-    st.write("Minimum: ", df_description[feature]['min'])
-    st.write("Maximum: ", df_description[feature]['max'])
+    st.write("Count: ", feature_stats.count)
+    st.write("Missing Count: ", feature_stats.missing)
+    st.write("Mean: ", feature_stats.mean)
+    st.write("Standard Deviation: ", feature_stats.std)
+    st.write("Minimum: ", feature_stats.min)
+    st.write("Maximum: ", feature_stats.max)
 
     # create plots for distribution
     st.subheader("Distribution Plots")
@@ -152,6 +175,15 @@ def display_individual_feature_distribution(df,num_columns):
     elif plot_type=='Density Plot':
         fig = px.density_contour(df,x=feature,title=f'Density plot of {feature}')
 
+    elif plot_type=='Box Plot' and len(df) >= sketches.SKETCH_MIN_ROWS:
+        # Large frames: draw the box from sketched quartiles instead of sending every value.
+        # Whiskers are the 1.5 IQR fences clipped to the column range.
+        q25,q50,q75 = profile.quartiles(df,feature)
+        iqr = q75 - q25
+        fig = go.Figure(go.Box(name=feature,q1=[q25],median=[q50],q3=[q75],
+                               lowerfence=[max(feature_stats.min, q25 - 1.5*iqr)],upperfence=[min(feature_stats.max, q75 + 1.5*iqr)]))
+        fig.update_layout(title=f'Box plot of {feature}')
+
     elif plot_type=='Box Plot':
         fig = px.box(df,y=feature,title=f'Box plot of {feature}')
 
@@ -173,25 +205,74 @@ def display_scatter_plot_of_two_numeric_features(df,num_columns):
 
 
 
-def categorical_variable_analysis(df,cat_columns):
+# Function to keep the top_n most frequent categories and sum the rest into "Other"
+def top_n_with_other(counts,top_n):
+    counts = counts.sort_values(ascending=False, kind="stable")
+    if len(counts) <= top_n:
+        return counts
+    top = counts.iloc[:top_n]
+    top.index = top.index.astype(object)
+    return pd.concat([top, pd.Series({"Other": counts.iloc[top_n:].sum()})])
+
+
+# Function to keep the top_n rows of a count table by total and sum the rest into an "Other" row
+def top_n_rows_with_other(table,top_n):
+    if len(table) <= top_n:
+        return table
+    order = table.sum(axis=1).sort_values(ascending=False, kind="stable").index
+    top = table.loc[order[:top_n]]
+    other = table.loc[order[top_n:]].sum().to_frame("Other").T
+    return pd.concat([top, other])
+
+
+# Function to get the value counts of a column, from the profile when it keeps them
+def column_value_counts(df,column,profile):
+    counts = profile.column(df,column).counts()
+    if counts is None:
+        counts = df[column].value_counts()
+    return counts
 
-    categorical_feature = st.selectbox(label="Select Categorical Feature",options=cat_columns)
+
+# The charts below are built from aggregated counts computed on the server, so
+# Plotly receives one bar/slice per category instead of one per row.
+def categorical_variable_analysis(df,cat_columns,profile=None):
+    profile = profile or DatasetProfile()
+
+    catalog = profile.catalog(df)
+    categorical_feature = column_picker("Select Categorical Feature", catalog, key="cat_analysis_feature", multi=False, role="categorical")
     categorical_plot_type = st.selectbox(label="Select Plot Type",options=["Bar Chart","Pie Chart","Stacked Bar Chart","Frequency Count"])
-    
+    top_n = st.number_input("Show top N categories (the rest are grouped as Other)", min_value=1, value=DEFAULT_TOP_N)
+
+    if categorical_plot_type in ("Bar Chart","Pie Chart"):
+        counts = top_n_with_other(column_value_counts(df,categorical_feature,profile), top_n)
+        counts_df = pd.DataFrame({categorical_feature: counts.index.astype(str), "Count": counts.to_numpy()})
+
     if categorical_plot_type =="Bar Chart":
-        fig = px.bar(df,x=categorical_feature,title=f"Bar Chart of {categorical_feature}")
+        fig = px.bar(counts_df,x=categorical_feature,y="Count",title=f"Bar Chart of {categorical_feature}")
 
     elif categorical_plot_type == "Pie Chart":
-        fig = px.pie(df,names=categorical_feature,title=f"Pie Chart of {categorical_feature}")
+        fig = px.pie(counts_df,names=categorical_feature,values="Count",title=f"Pie Chart of {categorical_feature}")
 
     elif categorical_plot_type == "Stacked Bar Chart":
         st.write("Select a second categorical feature for stacking")
-        second_categorical_feature = st.selectbox(label="Select Second Categorical Feature",options=cat_columns)
+        second_categorical_feature = column_picker("Select Second Categorical Feature", catalog, key="cat_analysis_second", multi=False, role="categorical")
 
-        fig = px.bar(df,x=categorical_feature,color=second_categorical_feature,title=f"Stacked Bar Chart of {categorical_feature} by {second_categorical_feature}")
+        if second_categorical_feature == categorical_feature:
+            counts = top_n_with_other(column_value_counts(df,categorical_feature,profile), top_n)
+            stacked = pd.DataFrame({categorical_feature: counts.index.astype(str), "Count": counts.to_numpy()})
+        else:
+            table = profile.crosstab(df,categorical_feature,second_categorical_feature)
+            table = top_n_rows_with_other(table, top_n)
+            table = top_n_rows_with_other(table.T, top_n).T
+            stacked = table.rename_axis(index=categorical_feature, columns=second_categorical_feature).stack().rename("Count").reset_index()
+            stacked = stacked[stacked["Count"] > 0]
+            stacked[categorical_feature] = stacked[categorical_feature].astype(str)
+            stacked[second_categorical_feature] = stacked[second_categorical_feature].astype(str)
+
+        fig = px.bar(stacked,x=categorical_feature,y="Count",color=second_categorical_feature,title=f"Stacked Bar Chart of {categorical_feature} by {second_categorical_feature}")
 
     elif categorical_plot_type == "Frequency Count":
-        cat_value_counts = df[categorical_feature].value_counts()
+        cat_value_counts = column_value_counts(df,categorical_feature,profile)
         st.write(f"Frequency Count for {categorical_feature}: ")
         st.write(cat_value_counts)
 
@@ -226,16 +307,100 @@ def feature_exploration_numerical_variables(df,num_columns):
             st.pyplot(plt)     
 
 
-def categorical_numerical_variable_analysis(df,cat_columns,num_columns):
-    categorical_feature_1 = st.selectbox(label="Categorical Feature", options=cat_columns)        
-    numerical_feature_1 = st.selectbox(label="Numerical Feature", options=num_columns)
-
-# Group by the selected categorical column and calculate the mean of the numerical column
-    group_data = df.groupby(categorical_feature_1)[numerical_feature_1].mean().reset_index()
+def categorical_numerical_variable_analysis(df,cat_columns,num_columns,profile=None):
+    profile = profile or DatasetProfile()
+    catalog = profile.catalog(df)
+    categorical_feature_1 = column_picker("Categorical Feature", catalog, key="cube_cat_feature", multi=False, role="categorical")
+    numerical_feature_1 = column_picker("Numerical Feature", catalog, key="cube_num_feature", multi=False, numeric=True)
+    aggregation = st.selectbox(label="Aggregation", options=CUBE_AGGREGATIONS, index=CUBE_AGGREGATIONS.index("mean"), key="cube_aggregation")
+    chart_type = st.selectbox(label="Chart Type", options=["Bar Chart","Line Chart","Table"], key="cube_chart_type")
+    top_n = st.number_input("Show top N categories by count", min_value=1, value=DEFAULT_TOP_N, key="cat_num_top_n")
+
+# The cube holds every aggregation for the pair and is computed once per dataset version,
+# so switching aggregation or chart type does not scan the data again
+    cube = profile.cube(df, categorical_feature_1, numerical_feature_1)
+    cube = cube.sort_values("count", ascending=False, kind="stable")
+    if len(cube) > top_n:
+        rest = cube.iloc[top_n:]
+        # Quartiles of the merged categories cannot be derived from the per-category ones
+        other = pd.DataFrame({"count": rest["count"].sum(), "sum": rest["sum"].sum(),
+                              "mean": rest["sum"].sum() / rest["count"].sum(),
+                              "min": rest["min"].min(), "max": rest["max"].max()}, index=["Other"])
+        cube = pd.concat([cube.iloc[:top_n].rename(index=str), other])
+    group_data = cube[aggregation].rename(numerical_feature_1).rename_axis(categorical_feature_1).reset_index()
+    group_data[categorical_feature_1] = group_data[categorical_feature_1].astype(str)
 
     st.subheader("Relationship between Categorical and Numerical Variables")
-    st.write(f"Mean {numerical_feature_1} by {categorical_feature_1}")
+    st.write(f"{aggregation.capitalize()} {numerical_feature_1} by {categorical_feature_1}")
     
-    # Create a bar chart
-    fig = px.bar(group_data, x=categorical_feature_1, y=numerical_feature_1, title=f"{numerical_feature_1} by {categorical_feature_1}")
+    if chart_type == "Table":
+        st.write(cube)
+        return
+
+    # Create the chart from the aggregated rows
+    if chart_type == "Bar Chart":
+        fig = px.bar(group_data, x=categorical_feature_1, y=numerical_feature_1, title=f"{numerical_feature_1} by {categorical_feature_1}")
+    else:
+        fig = px.line(group_data, x=categorical_feature_1, y=numerical_feature_1, markers=True, title=f"{numerical_feature_1} by {categorical_feature_1}")
     st.plotly_chart(fig, use_container_width=True)
+
+
+## Time series
+
+# Function to explore a datetime column over time
+# Events are binned on the server from the cached sorted timestamps (see time_series.py),
+# so the chart only receives the resampled points, at most time_series.MAX_POINTS of them
+def display_time_series(df,profile=None):
+    profile = profile or DatasetProfile()
+    time_columns = profile.datetime_columns(df)
+    if not time_columns:
+        st.info("No datetime columns detected in the dataset.")
+        return
+
+    catalog = profile.catalog(df)
+    cols = st.columns(2)
+    with cols[0]:
+        time_column = column_picker("Time column", catalog, key="ts_time_column", multi=False, role="datetime")
+    with cols[1]:
+        value_column = None
+        if not st.checkbox("Count events only", value=True, key="ts_count_only"):
+            value_column = column_picker("Value column", catalog, key="ts_value_column", multi=False, numeric=True)
+
+    cols = st.columns(3)
+    unit = cols[0].radio("Resample per", ["Minute","Hour","Day","Week"], index=1, horizontal=True, key="ts_unit")
+    aggregation = cols[1].selectbox("Aggregation", time_series.AGGREGATIONS if value_column else ["count"], key="ts_aggregation")
+    window = cols[2].number_input("Rolling window (bins)", min_value=1, value=1, key="ts_window")
+
+    sorted_ns, positions = profile.time_order(df, time_column)
+    if len(sorted_ns) == 0:
+        st.info(f"{time_column} has no values.")
+        return
+    width = time_series.bin_width(sorted_ns, unit)
+    values = None
+    if value_column:
+        values = df[value_column].to_numpy(dtype=float, na_value=np.nan)[positions]
+    resampled = time_series.resample(sorted_ns, values, width)
+
+    series = resampled[aggregation].rename(aggregation)
+    plot_data = series.to_frame()
+    if window > 1:
+        plot_data[f"rolling {window}"] = time_series.rolling(series, window)
+    title = f"{aggregation} of {value_column}" if value_column else "Events"
+    fig = px.line(plot_data, title=f"{title} per {unit.lower()}")
+    fig.update_layout(xaxis_title=time_column, yaxis_title=None)
+    st.plotly_chart(fig, use_container_width=True)
+    note = f"{len(resampled)} bins from {len(sorted_ns)} timestamps"
+    if width != time_series.NS[unit]:
+        note += f"; bins widened to {pd.to_timedelta(width, unit='ns')} to stay under {time_series.MAX_POINTS} points"
+    st.caption(note)
+
+    st.subheader("Gaps")
+    cols = st.columns(2)
+    gap_size = cols[0].number_input("Report gaps longer than", min_value=1, value=1, key="ts_gap_size")
+    gap_unit = cols[1].selectbox("Unit", list(time_series.NS), index=2, key="ts_gap_unit")
+    count, gaps = time_series.find_gaps(sorted_ns, gap_size * time_series.NS[gap_unit])
+    if count:
+        st.write(f"{count} gaps longer than {gap_size} {gap_unit.lower()}(s); the {len(gaps)} longest:")
+        st.dataframe(gaps, hide_index=True)
+    else:
+        st.success(f"No gaps longer than {gap_size} {gap_unit.lower()}(s).")
@@ -1,8 +1,10 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder, StandardScaler, MinMaxScaler
-from scipy import stats
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+preprocessing = lazy_module("sklearn.preprocessing")
+stats = lazy_module("scipy.stats")
 
 
 def remove_selected_columns(df, columns_remove):
@@ -21,11 +23,11 @@ def fill_missing_data(df, columns, method):
     """Fill missing data using mean/median/mode."""
     for column in columns:
         if method == 'mean':
-            df[column].fillna(df[column].mean(), inplace=True)
+            df[column] = df[column].fillna(df[column].mean())
         elif method == 'median':
-            df[column].fillna(df[column].median(), inplace=True)
+            df[column] = df[column].fillna(df[column].median())
         elif method == 'mode':
-            df[column].fillna(df[column].mode().iloc[0], inplace=True)
+            df[column] = df[column].fillna(df[column].mode().iloc[0])
     return df
 
 
@@ -36,32 +38,38 @@ def one_hot_encode(df, columns):
 
 def label_encode(df, columns):
     """Perform Label Encoding."""
-    le = LabelEncoder()
+    le = preprocessing.LabelEncoder()
     for col in columns:
         df[col] = le.fit_transform(df[col].astype(str))
     return df
 
 
 def standard_scale(df, columns):
-    scaler = StandardScaler()
+    scaler = preprocessing.StandardScaler()
     df[columns] = scaler.fit_transform(df[columns])
     return df
 
 
 def min_max_scale(df, columns, feature_range=(0, 1)):
-    scaler = MinMaxScaler(feature_range=feature_range)
+    scaler = preprocessing.MinMaxScaler(feature_range=feature_range)
     df[columns] = scaler.fit_transform(df[columns])
     return df
 
 
-def detect_outliers_iqr(df, column_name):
-    """Detect outliers using IQR."""
+def detect_outliers_iqr(df, column_name, quartiles=None):
+    """Detect outliers using IQR.
+
+    `quartiles` (25/50/75%) can be passed in when already known, e.g. from
+    DatasetProfile.quartiles, to skip the percentile pass over the column.
+    """
     data = df[column_name]
-    q25, q50, q75 = np.percentile(data, [25, 50, 75])
+    if quartiles is None:
+        quartiles = np.percentile(data, [25, 50, 75])
+    q25, q50, q75 = quartiles
     iqr = q75 - q25
     lower = q25 - 1.5 * iqr
     upper = q75 + 1.5 * iqr
-    outliers = sorted([x for x in data if x < lower or x > upper])
+    outliers = np.sort(data[(data < lower) | (data > upper)].to_numpy()).tolist()
     return outliers
 
 
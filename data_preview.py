@@ -0,0 +1,171 @@
+# data_preview.py
+'''Paged data preview served from Arrow slices.
+
+Only one fixed-size window of rows is sent to the browser at a time. Without
+sorting or filtering a window is a zero-copy slice of the (usually
+memory-mapped) Arrow table; with them, a sort permutation and filter mask are
+computed once with pyarrow compute kernels, cached per dataset version, and
+the window is gathered with take(). Every window is also held under a hard
+byte cap per message. A pandas frame is previewed through FrameWindows, which
+converts only the window and the sort/filter column to Arrow.
+
+    EDA_PREVIEW_MAX_KB  largest window sent to the browser (default 2048)
+'''
+import math
+import os
+
+import streamlit as st
+
+from dataset_manager import frame_to_arrow
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+MAX_PREVIEW_BYTES = int(float(os.environ.get("EDA_PREVIEW_MAX_KB", 2048)) * 1024)
+
+PAGE_SIZES = [10, 20, 50, 100, 200]
+
+# Wider tables pick sort/filter columns by name instead of from a dropdown.
+MAX_COLUMN_OPTIONS = 200
+
+INDEX_PREFIX = "__index_level_"
+
+
+class FrameWindows:
+    """The part of the pyarrow Table API the preview uses, over a pandas frame.
+
+    Only the rows of a window, or the columns a sort or filter needs, are
+    converted to Arrow; the frame as a whole never is.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.num_rows = len(df)
+        self.schema = frame_to_arrow(df.iloc[:0]).schema
+
+    def slice(self, start: int, size: int):
+        return frame_to_arrow(self.df.iloc[start:start + size])
+
+    def take(self, positions):
+        return frame_to_arrow(self.df.iloc[positions])
+
+    def select(self, columns):
+        return frame_to_arrow(self.df[list(columns)])
+
+
+def data_columns(table) -> list:
+    """Column names of the table without the stored pandas index columns."""
+    return [name for name in table.schema.names if not name.startswith(INDEX_PREFIX)]
+
+
+def row_positions(table, sort_column=None, ascending=True, filter_column=None, filter_text=""):
+    """Return the row positions after sorting/filtering, or None for the natural order."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    positions = None
+    if sort_column:
+        order = "ascending" if ascending else "descending"
+        positions = pc.sort_indices(table.select([sort_column]), sort_keys=[(sort_column, order)],
+                                    null_placement="at_end").to_numpy()
+
+    if filter_column and filter_text:
+        column = pc.cast(table.select([filter_column]).column(filter_column), pa.string())
+        mask = pc.fill_null(pc.match_substring(column, filter_text, ignore_case=True), False).to_numpy()
+        if positions is None:
+            positions = np.flatnonzero(mask)
+        else:
+            positions = positions[mask[positions]]
+    return positions
+
+
+def window(table, positions, start: int, size: int):
+    """Return `size` rows from `start` in the given order."""
+    if positions is None:
+        return table.slice(start, size)
+    return table.take(positions[start:start + size])
+
+
+def fit_to_budget(page, max_bytes: int = MAX_PREVIEW_BYTES):
+    """Drop trailing data columns of a window that is still over the byte cap."""
+    columns = data_columns(page)
+    if page.nbytes > max_bytes and len(columns) > 1:
+        keep = max(1, int(len(columns) * max_bytes / page.nbytes))
+        index_columns = [name for name in page.schema.names if name.startswith(INDEX_PREFIX)]
+        page = page.select(columns[:keep] + index_columns)
+    return page
+
+
+def _column_choice(container, label, columns, table, key):
+    if len(columns) <= MAX_COLUMN_OPTIONS:
+        return container.selectbox(label, [None] + columns, key=key)
+    name = container.text_input(f"{label} (column name)", key=key)
+    if name and table.schema.get_field_index(name) < 0:
+        container.warning(f"No column named {name}")
+        return None
+    return name or None
+
+
+def clamp_page(key: str, pages: int):
+    """Keep a stored page number valid after the number of pages shrinks."""
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+
+
+def _cached_positions(key, token, table, sort_column, ascending, filter_column, filter_text):
+    request = (token, sort_column, ascending, filter_column, filter_text)
+    cache_key = f"{key}_positions"
+    cached = st.session_state.get(cache_key)
+    if token is not None and cached is not None and cached[0] == request:
+        return cached[1]
+    positions = row_positions(table, sort_column, ascending, filter_column, filter_text)
+    if token is not None:
+        st.session_state[cache_key] = (request, positions)
+    return positions
+
+
+def show_paged_preview(data, key: str, token=None, default_page_size: int = 20):
+    """Render a paged, sortable and filterable preview.
+
+    `data` is a pyarrow Table or a pandas DataFrame; `token` identifies the
+    data (e.g. session and version) so sort/filter results can be reused
+    across reruns.
+    """
+    table = data if hasattr(data, "schema") else FrameWindows(data)
+    columns = data_columns(table)
+    if table.num_rows == 0:
+        st.info("No rows to display.")
+        return
+
+    controls = st.columns(4)
+    page_size = controls[0].selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(default_page_size)
+                                      if default_page_size in PAGE_SIZES else 0, key=f"{key}_size")
+    sort_column = _column_choice(controls[1], "Sort by", columns, table, f"{key}_sort")
+    ascending = controls[1].toggle("Ascending", value=True, key=f"{key}_ascending")
+    filter_column = _column_choice(controls[2], "Filter column", columns, table, f"{key}_filter_column")
+    filter_text = controls[2].text_input("Contains", key=f"{key}_filter_text")
+
+    positions = _cached_positions(key, token, table, sort_column, ascending, filter_column, filter_text)
+    total = table.num_rows if positions is None else len(positions)
+    if total == 0:
+        st.info("No rows match the filter.")
+        return
+
+    # Shrink the page so a full window stays under the byte cap.
+    probe = window(table, positions, 0, min(total, page_size))
+    bytes_per_row = max(1, probe.nbytes // max(1, probe.num_rows))
+    rows_per_page = max(1, min(page_size, MAX_PREVIEW_BYTES // bytes_per_row))
+
+    pages = math.ceil(total / rows_per_page)
+    clamp_page(f"{key}_page", pages)
+    page = controls[3].number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+
+    page_table = fit_to_budget(window(table, positions, (page - 1) * rows_per_page, rows_per_page))
+    st.dataframe(page_table.to_pandas(), use_container_width=True)
+
+    notes = [f"Rows {(page - 1) * rows_per_page + 1}-{min(page * rows_per_page, total)} of {total}"]
+    if rows_per_page < page_size:
+        notes.append(f"{rows_per_page} rows per page to stay under {MAX_PREVIEW_BYTES // 1024} KB")
+    if len(data_columns(page_table)) < len(columns):
+        notes.append(f"first {len(data_columns(page_table))} of {len(columns)} columns shown")
+    st.caption(" · ".join(notes))
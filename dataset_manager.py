@@ -0,0 +1,472 @@
+# dataset_manager.py
+'''Server-wide store for the datasets of every browser session.
+
+Each session keeps a list of immutable dataset versions (the loaded file plus
+one version per preprocessing step). Resident versions are counted against a
+per-session and a global memory budget; when a budget is exceeded the least
+recently used versions are spilled to uncompressed Arrow IPC files and are
+memory-mapped back in transparently the next time they are requested.
+
+Budgets are configured through environment variables:
+    EDA_SESSION_MEMORY_MB  per-session resident budget (default 512)
+    EDA_GLOBAL_MEMORY_MB   budget across all sessions (default 4096)
+    EDA_SPILL_DIR          directory for spilled versions (default <tmp>/eda_spill)
+    EDA_MAX_VERSIONS       versions kept per session (default 10)
+    EDA_SESSION_TTL        seconds before an idle session is dropped (default 6h)
+'''
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import streamlit as st
+
+from column_profile import DatasetProfile
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+MB = 1024 * 1024
+
+SESSION_BUDGET_BYTES = int(float(os.environ.get("EDA_SESSION_MEMORY_MB", 512)) * MB)
+GLOBAL_BUDGET_BYTES = int(float(os.environ.get("EDA_GLOBAL_MEMORY_MB", 4096)) * MB)
+SPILL_DIR = os.environ.get("EDA_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "eda_spill")
+MAX_VERSIONS = int(os.environ.get("EDA_MAX_VERSIONS", 10))
+SESSION_TTL_SECONDS = int(os.environ.get("EDA_SESSION_TTL", 6 * 3600))
+
+
+def frame_nbytes(df: pd.DataFrame, shared: pd.DataFrame = None) -> int:
+    """Return the in-memory size of a dataframe, including object payloads.
+
+    Columns still backed by the buffers of the `shared` frame are not counted.
+    """
+    sizes = df.memory_usage(deep=True, index=False).to_numpy()
+    total = int(df.index.memory_usage(deep=True))
+    for position, size in enumerate(sizes):
+        if shared is not None and _shares_column(df.iloc[:, position], shared, df.columns[position]):
+            continue
+        total += int(size)
+    return total
+
+
+def _shares_column(column: pd.Series, shared: pd.DataFrame, name) -> bool:
+    try:
+        return np.may_share_memory(column.values, shared[name].values)
+    except Exception:
+        return False
+
+
+def write_arrow(df: pd.DataFrame, path: str):
+    """Write a dataframe (index included) to an uncompressed Arrow IPC file."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    feather.write_feather(table, path, compression="uncompressed")
+
+
+def open_arrow(path: str):
+    """Memory-map an Arrow IPC file as a pyarrow Table without reading it."""
+    import pyarrow.feather as feather
+
+    return feather.read_table(path, memory_map=True)
+
+
+def read_arrow(path: str) -> pd.DataFrame:
+    """Memory-map an Arrow IPC file written by write_arrow back into pandas.
+
+    One block per column keeps null-free numeric columns as zero-copy views
+    of the mapped file and lets copy-on-write copy columns individually.
+    """
+    return open_arrow(path).to_pandas(split_blocks=True)
+
+
+def frame_to_arrow(df: pd.DataFrame):
+    """Convert a frame for display, stringifying object columns Arrow cannot type."""
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowException, ValueError):
+        objects = df.select_dtypes(include=["object"]).columns
+        return pa.Table.from_pandas(df.astype({col: str for col in objects}), preserve_index=True)
+
+
+class DatasetVersion:
+    """One immutable dataset version; `df` is None while it is spilled.
+
+    `shared` is the read-only registry frame the version was derived from;
+    columns still backed by it are not charged to the session. `profile`
+    holds its column statistics and stays in memory while the data is spilled.
+    `path` is the version's own Arrow file, `source_path` the Arrow file of
+    the shared dataset it is identical to; the registry may delete that file
+    once the dataset is evicted, so such a version reloads from `shared`.
+    `table` is the memory-mapped Arrow view used by the paged preview.
+    """
+
+    def __init__(self, session_id: str, version: int, label: str, df: pd.DataFrame, shared=None,
+                 profile=None, source_path=None):
+        self.session_id = session_id
+        self.version = version
+        self.label = label
+        self.df = df
+        self.shared = shared
+        self.profile = profile or DatasetProfile()
+        self.path = None
+        self.source_path = source_path
+        self.table = None
+        self.spilling = False  # being written to its Arrow file outside the manager lock
+        self.pinned = False  # Arrow cannot store it, so it is never spilled
+        self.nbytes = frame_nbytes(df, shared)
+        self.shape = df.shape
+        self.created = time.time()
+
+    @property
+    def resident(self) -> bool:
+        return self.df is not None
+
+    @property
+    def arrow_path(self):
+        return self.path or self.source_path
+
+    def load(self) -> pd.DataFrame:
+        """Read the content of a spilled version back (memory-mapped)."""
+        if self.path is None and self.source_path is not None:
+            return self.shared.copy(deep=False)
+        return read_arrow(self.path)
+
+
+class DatasetManager:
+    """Versioned per-session datasets with memory budgets and LRU spilling."""
+
+    def __init__(self, session_budget=SESSION_BUDGET_BYTES, global_budget=GLOBAL_BUDGET_BYTES,
+                 spill_dir=SPILL_DIR, max_versions=MAX_VERSIONS, session_ttl=SESSION_TTL_SECONDS):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.spill_dir = spill_dir
+        self.max_versions = max_versions
+        self.session_ttl = session_ttl
+        self._lock = threading.RLock()
+        # (session_id, version) -> DatasetVersion, least recently used first
+        self._lru = OrderedDict()
+        self._sessions = {}  # session_id -> list of version numbers, oldest first
+        self._last_seen = {}
+
+    # ---- public API ----
+
+    def put(self, session_id: str, df: pd.DataFrame, label: str = "", shared=None,
+            columns=None, renamed=None, rows=False) -> int:
+        """Store `df` as the newest version of the session and return its number.
+
+        The frame is treated as immutable from here on; callers must copy
+        before modifying it. `shared` is the SharedDataset a freshly loaded
+        `df` is attached to; without it, the version inherits the shared frame
+        of the previous version. `columns`, `renamed` and `rows` describe
+        what the step changed relative to the previous version (see
+        DatasetProfile.derive) so its column statistics can be carried over.
+        """
+        previous = previous_df = None
+        if shared is None:
+            with self._lock:
+                versions = self._sessions.get(session_id)
+                previous = self._lru[(session_id, versions[-1])] if versions else None
+                previous_df = previous.df if previous is not None else None
+            if previous_df is None and previous is not None and (columns or renamed or rows):
+                # The previous version is spilled: statistics and checksums are
+                # still derived from it, memory-mapped outside the lock.
+                previous_df = previous.load()
+
+        with self._lock:
+            self._expire_idle_sessions()
+            versions = self._sessions.setdefault(session_id, [])
+            number = versions[-1] + 1 if versions else 0
+            if shared is not None:
+                # A fresh load: the shared Arrow file holds exactly `df`.
+                profile = DatasetProfile(sketches=shared.sketches, checksums=shared.checksums)
+                entry = DatasetVersion(session_id, number, label, df, shared.frame, profile, shared.path)
+            else:
+                profile = shared_frame = None
+                if previous is not None:
+                    shared_frame = previous.shared
+                    profile = previous.profile.derive(previous_df, df, columns, renamed, rows)
+                entry = DatasetVersion(session_id, number, label, df, shared_frame, profile)
+            versions.append(number)
+            self._lru[(session_id, number)] = entry
+            self._touch(session_id)
+
+            while len(versions) > self.max_versions:
+                self._discard(self._lru.pop((session_id, versions.pop(0))))
+
+            victims = self._enforce_budgets(session_id, keep=entry)
+        self._spill_all(victims)
+        return number
+
+    def get(self, session_id: str, version: int = None):
+        """Return a version of the session (the latest by default), reloading it if spilled."""
+        with self._lock:
+            entry = self._entry(session_id, version)
+            if entry is None:
+                return None
+
+            self._lru.move_to_end((session_id, entry.version))
+            self._touch(session_id)
+            if entry.resident:
+                return entry.df
+
+        # Memory-mapping a large file back in does not hold up other sessions.
+        df = entry.load()
+        with self._lock:
+            if not entry.resident and self._lru.get((session_id, entry.version)) is entry:
+                entry.df = df
+                entry.nbytes = frame_nbytes(df, entry.shared)
+            victims = self._enforce_budgets(session_id, keep=entry)
+        self._spill_all(victims)
+        return df
+
+    def profile(self, session_id: str, version: int = None):
+        """Return the column statistics of a version (the latest by default)."""
+        with self._lock:
+            entry = self._entry(session_id, version)
+            return entry.profile if entry is not None else None
+
+    def latest_version(self, session_id: str):
+        with self._lock:
+            versions = self._sessions.get(session_id)
+            return versions[-1] if versions else None
+
+    def arrow_table(self, session_id: str, version: int = None):
+        """Return a version as a pyarrow Table memory-mapped from its Arrow file.
+
+        Returns None for a version that has no file (it was never spilled and
+        is not a shared dataset); previews then convert only the rows they
+        show from the frame (see data_preview.FrameWindows).
+        """
+        with self._lock:
+            entry = self._entry(session_id, version)
+            if entry is None:
+                return None
+            if entry.table is not None or entry.arrow_path is None:
+                return entry.table
+            path = entry.arrow_path
+
+        try:
+            table = open_arrow(path)
+        except OSError:
+            return None  # a shared dataset file deleted after eviction
+        with self._lock:
+            entry.table = table
+        return table
+
+    def has(self, session_id: str) -> bool:
+        with self._lock:
+            return bool(self._sessions.get(session_id))
+
+    def versions(self, session_id: str) -> pd.DataFrame:
+        """Return a table describing the versions held for a session."""
+        with self._lock:
+            rows = []
+            for number in self._sessions.get(session_id, []):
+                entry = self._lru[(session_id, number)]
+                rows.append([number, entry.label, entry.shape[0], entry.shape[1],
+                             entry.nbytes / MB, "memory" if entry.resident else "disk"])
+        return pd.DataFrame(rows, columns=["Version", "Step", "Rows", "Columns", "Size (MB)", "Location"])
+
+    def usage(self) -> pd.DataFrame:
+        """Return resident and spilled bytes per session."""
+        with self._lock:
+            usage = {}
+            for entry in self._lru.values():
+                row = usage.setdefault(entry.session_id, [entry.session_id, 0, 0, 0])
+                row[1 if entry.resident else 2] += entry.nbytes / MB
+                row[3] += 1
+        return pd.DataFrame(list(usage.values()),
+                            columns=["Session", "Memory (MB)", "Spilled (MB)", "Versions"])
+
+    def drop_session(self, session_id: str):
+        """Forget every version of a session and delete its spill files."""
+        with self._lock:
+            for number in self._sessions.pop(session_id, []):
+                self._discard(self._lru.pop((session_id, number)))
+            self._last_seen.pop(session_id, None)
+            shutil.rmtree(os.path.join(self.spill_dir, session_id), ignore_errors=True)
+
+    # ---- internals ----
+
+    def _entry(self, session_id, version=None):
+        versions = self._sessions.get(session_id)
+        if not versions:
+            return None
+        return self._lru.get((session_id, versions[-1] if version is None else version))
+
+    def _touch(self, session_id):
+        self._last_seen[session_id] = time.time()
+
+    def _expire_idle_sessions(self):
+        cutoff = time.time() - self.session_ttl
+        for session_id, seen in list(self._last_seen.items()):
+            if seen < cutoff:
+                self.drop_session(session_id)
+
+    def _resident_bytes(self, session_id=None) -> int:
+        # Versions being spilled no longer count against the budgets.
+        return sum(e.nbytes for e in self._lru.values()
+                   if e.resident and not e.spilling and (session_id is None or e.session_id == session_id))
+
+    def _enforce_budgets(self, session_id, keep) -> list:
+        """Pick the versions to spill, under the lock.
+
+        Versions whose content is already in an Arrow file are dropped from
+        memory at once; the others are returned as (entry, frame) for
+        _spill_all() to write after the lock is released.
+        """
+        victims = []
+
+        def spillable(entry):
+            return entry is not keep and entry.resident and not entry.spilling and not entry.pinned
+
+        # A single version larger than the budget stays resident: it is the
+        # one the user is looking at, and spilling it would only thrash.
+        for entry in list(self._lru.values()):
+            if self._resident_bytes(session_id) <= self.session_budget:
+                break
+            if entry.session_id == session_id and spillable(entry):
+                self._pick(entry, victims)
+
+        for entry in list(self._lru.values()):
+            if self._resident_bytes() <= self.global_budget:
+                break
+            if spillable(entry):
+                self._pick(entry, victims)
+        return victims
+
+    def _pick(self, entry, victims):
+        if entry.arrow_path is not None:
+            entry.df = None
+        else:
+            entry.spilling = True
+            victims.append((entry, entry.df))
+
+    def _spill_all(self, victims):
+        """Write picked versions to Arrow files without holding the lock, then drop their frames."""
+        for entry, df in victims:
+            path = self._write(entry, df)
+            with self._lock:
+                entry.spilling = False
+                if path is None:
+                    entry.pinned = True
+                elif self._lru.get((entry.session_id, entry.version)) is entry:
+                    entry.path, entry.df = path, None
+                else:
+                    _remove(path)  # discarded while it was written
+
+    def _write(self, entry, df):
+        directory = os.path.join(self.spill_dir, entry.session_id)
+        path = os.path.join(directory, f"v{entry.version}.arrow")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            write_arrow(df, path)
+        except Exception:
+            # Frames Arrow cannot represent (e.g. mixed-type object
+            # columns) stay in memory rather than failing the request.
+            _remove(path)
+            return None
+        return path
+
+    def _discard(self, entry):
+        entry.df = None
+        entry.table = None
+        # source_path belongs to the shared registry and is never deleted here.
+        if entry.path is not None:
+            _remove(entry.path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# -----------------------------
+# Streamlit session helpers
+# -----------------------------
+
+@st.cache_resource
+def get_dataset_manager() -> DatasetManager:
+    """Return the manager shared by every session of this server process."""
+    return DatasetManager()
+
+
+def session_id() -> str:
+    if "dataset_session_id" not in st.session_state:
+        st.session_state["dataset_session_id"] = uuid.uuid4().hex
+    return st.session_state["dataset_session_id"]
+
+
+def store_dataset(df: pd.DataFrame, label: str, shared=None, columns=None, renamed=None,
+                  rows=False) -> int:
+    """Store `df` as the session's current dataset.
+
+    Pass what the step changed (`columns`, `renamed`, `rows`) so unchanged
+    column statistics are reused instead of recomputed.
+    """
+    return get_dataset_manager().put(session_id(), df, label, shared, columns, renamed, rows)
+
+
+def current_dataset():
+    """Return the session's current dataset, or None if nothing was loaded."""
+    return get_dataset_manager().get(session_id())
+
+
+def current_profile():
+    """Return the column statistics of the session's current dataset."""
+    return get_dataset_manager().profile(session_id())
+
+
+def session_versions():
+    """Return the table of the session's versions (see DatasetManager.versions)."""
+    return get_dataset_manager().versions(session_id())
+
+
+def dataset_version(version: int):
+    """Return (frame, profile) of one of the session's versions."""
+    manager = get_dataset_manager()
+    sid = session_id()
+    return manager.get(sid, version), manager.profile(sid, version)
+
+
+def current_arrow_table():
+    """Return (memory-mapped Arrow table or None, cache token) for the session's current dataset."""
+    manager = get_dataset_manager()
+    sid = session_id()
+    return manager.arrow_table(sid), f"{sid}:{manager.latest_version(sid)}"
+
+
+def has_dataset() -> bool:
+    return get_dataset_manager().has(session_id())
+
+
+def show_memory_usage():
+    """Render the session's versions and the server-wide memory usage."""
+    manager = get_dataset_manager()
+    sid = session_id()
+    if not manager.has(sid):
+        st.info("No dataset loaded in this session.")
+        return
+
+    st.markdown("**Versions in this session**")
+    st.dataframe(manager.versions(sid), hide_index=True)
+
+    usage = manager.usage()
+    mine = usage[usage["Session"] == sid]
+    st.write(f"This session: {mine['Memory (MB)'].sum():.1f} MB in memory, "
+             f"{mine['Spilled (MB)'].sum():.1f} MB spilled "
+             f"(budget {manager.session_budget / MB:.0f} MB)")
+    st.write(f"Server: {usage['Memory (MB)'].sum():.1f} MB in memory across {len(usage)} sessions "
+             f"(budget {manager.global_budget / MB:.0f} MB)")
@@ -0,0 +1,53 @@
+# lazy_imports.py
+'''Deferred imports of the heavy libraries.
+
+pandas, numpy, matplotlib, seaborn, plotly, scipy, sklearn and pyarrow take
+seconds to import together, which every new server process used to pay before
+even the Home page rendered. Modules bind them with lazy_module() instead of
+`import`, and the real import happens on first attribute access, i.e. when a
+page or function that needs the library actually runs:
+
+    pd = lazy_module("pandas")
+    plt = lazy_module("matplotlib.pyplot")
+
+Modules that annotate with lazy names use `from __future__ import annotations`
+so the annotations do not trigger the import at definition time.
+'''
+import importlib
+import threading
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name: str, on_import=None):
+        self._name = name
+        self._on_import = on_import
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_import is not None:
+                        self._on_import(module)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "imported" if self._module is not None else "not imported"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name: str, on_import=None) -> LazyModule:
+    """Return a lazily imported module; `on_import(module)` runs once after the import."""
+    return LazyModule(name, on_import)
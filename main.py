@@ -1,14 +1,24 @@
+import io
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from streamlit_option_menu import option_menu
 
-# Local imports
+# Local imports. They import pandas, plotting and ML libraries lazily
+# (see lazy_imports.py), so the Home page does not pay for them.
 import data_analysis_functions as function
 import data_preprocessing_function as preprocessing_function
 import home_page
 import advanced_analysis
+import dataset_manager
+import shared_datasets
+import multi_ingest
+import sketches
+import version_diff
+import quality_rules
+from data_preview import show_paged_preview
+from column_catalog import column_picker
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")
 
 # -------------------------
 # Page config & global CSS
@@ -36,7 +46,8 @@ st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
 # -------------------------
 with st.sidebar:
     st.markdown("<h2 style='color:#5A5DF0;text-align:center;'>✨ AutoEDA</h2>", unsafe_allow_html=True)
-    uploaded_file = st.file_uploader("📤 Upload CSV / Excel", type=["csv", "xls", "xlsx"])
+    uploaded_files = st.file_uploader("📤 Upload CSV / Excel", type=["csv", "xls", "xlsx"], accept_multiple_files=True)
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
     
     # --- FIX: Changed checkbox to button ---
     use_example = st.button("Load Example Titanic Dataset")
@@ -63,262 +74,424 @@ selected = option_menu(
 # Data loading
 # -------------------------
 
+# Sessions share read-only frames from the shared dataset registry and work on
+# shallow copies; copy-on-write makes each step copy only the columns it changes.
+# Set before the first frame is created, which is never on a plain Home page visit;
+# pandas 3 always copies on write and deprecates the option.
+if (uploaded_files or use_example or selected != "Home") and int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+def parse_upload(data):
+    return function.load_data_with_sketches(io.BytesIO(data))
+
+
+def join_key_options(files):
+    # Header reads are cached per set of uploaded files.
+    ids = tuple(file.file_id for file in files)
+    cached = st.session_state.get("join_key_options")
+    if cached is None or cached[0] != ids:
+        cached = st.session_state["join_key_options"] = (ids, multi_ingest.common_columns(files))
+    return cached[1]
+
+
+def load_uploaded_files(files, join_key=None, how="outer"):
+    status = st.sidebar.status(f"Loading {len(files)} files", expanded=True)
+    bar = status.progress(0.0)
+
+    def report(name, rows, done, total):
+        bar.progress(done / total, text=f"{done}/{total} files parsed")
+        status.write(f"{name}: {rows}")
+
+    def parse_uploads(data):
+        return function.load_data_with_sketches(data, key=join_key, how=how, progress=report)
+
+    options = f"join:{join_key}:{how}" if join_key else "concat"
+    try:
+        shared, df = shared_datasets.load_shared_many(files, parse_uploads, options)
+    except multi_ingest.SchemaConflict as e:
+        status.update(label="Schema conflict, loading stopped", state="error")
+        st.sidebar.error(str(e))
+        return
+    dataset_manager.store_dataset(df, f"Loaded {len(files)} files", shared)
+    status.update(label=f"Loaded {len(files)} files: {df.shape[0]} rows, {df.shape[1]} columns",
+                  state="complete", expanded=False)
+
+
+# Several files are combined as the sidebar says, once "Load files" is pressed.
+if len(uploaded_files) > 1:
+    with st.sidebar:
+        combine = st.radio("Combine files", ["Concatenate", "Join on key"], key="combine_mode")
+        join_key, how = None, "outer"
+        if combine == "Join on key":
+            join_key = st.selectbox("Key column", join_key_options(uploaded_files), key="join_key")
+            how = st.selectbox("Join type", multi_ingest.JOIN_TYPES, index=multi_ingest.JOIN_TYPES.index("outer"),
+                               key="join_how")
+        load_files = st.button(f"Load {len(uploaded_files)} files")
+    if load_files:
+        if combine == "Join on key" and join_key is None:
+            st.sidebar.error("The files have no column in common to join on.")
+        else:
+            load_uploaded_files(uploaded_files, join_key, how)
+
+
 # --- FIX: Changed 'elif' to 'if' ---
 # This ensures a button click or file upload
 # sets the session state only *once*.
+# The uploader keeps returning the same file on every rerun, so it is only
+# parsed again when a different file is uploaded.
 
-if uploaded_file:
-    df = function.load_data(uploaded_file)
-    st.session_state["new_df"] = df.copy()
+if uploaded_file and st.session_state.get("loaded_file_id") != uploaded_file.file_id:
+    shared, df = shared_datasets.load_shared(uploaded_file, parse_upload)
+    dataset_manager.store_dataset(df, f"Loaded {uploaded_file.name}", shared)
+    st.session_state["loaded_file_id"] = uploaded_file.file_id
 
 if use_example:
-    df = function.load_data("example_dataset/titanic.csv")
-    st.session_state["new_df"] = df.copy()
+    shared, df = shared_datasets.load_shared("example_dataset/titanic.csv", parse_upload)
+    dataset_manager.store_dataset(df, "Loaded titanic.csv", shared)
+
+with st.sidebar:
+    with st.expander("💾 Memory usage"):
+        dataset_manager.show_memory_usage()
 
 # HOME PAGE
 if selected == "Home":
     home_page.show_home_page()
 
 # If no data and not Home -> stop execution
-if selected != "Home" and ("new_df" not in st.session_state):
+if selected != "Home" and not dataset_manager.has_dataset():
     st.warning("Please upload a dataset first.")
     st.stop()
 
 # -------------------------
-# DATA EXPLORATION
+# Section rendering helpers
 # -------------------------
-if selected == "Data Exploration":
-    df = st.session_state["new_df"]
-    num_cols, cat_cols = function.categorical_numerical(df)
 
-    tab1, tab2 = st.tabs(["📊 Overview", "🔍 Visualization"])
+# st.tabs executes the body of every tab on each rerun, so pages use a
+# section selector instead and only the selected section is rendered.
+# Sections and cards are st.fragments: widget interactions inside one
+# rerun just that unit. Anything that changes the dataset calls st.rerun(),
+# which reruns the whole app so every section sees the new data.
 
-    with tab1:
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("📁 Dataset Overview")
-        function.display_dataset_overview(df, cat_cols, num_cols)
-        st.markdown("</div>", unsafe_allow_html=True)
+def section_selector(options, key):
+    return st.radio("Section", options, horizontal=True, key=key, label_visibility="collapsed")
 
-        st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("❌ Missing Values")
-        function.display_missing_values(df)
-        st.markdown("</div>", unsafe_allow_html=True)
+@st.fragment
+def card(title, render, *args):
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+    st.subheader(title)
+    render(*args)
+    st.markdown("</div>", unsafe_allow_html=True)
 
-        st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("📊 Statistics & Types")
-        function.display_statistics_visualization(df, cat_cols, num_cols)
-        function.display_data_types(df)
-        st.markdown("</div>", unsafe_allow_html=True)
+def spacer():
+    st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
-    with tab2:
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("📈 Feature Distributions")
-        function.display_individual_feature_distribution(df, num_cols)
-        st.markdown("</div>", unsafe_allow_html=True)
 
-        st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+# -------------------------
+# Data Exploration sections
+# -------------------------
+
+def exploration_overview_section(df, cat_cols, num_cols, profile):
+    table, token = dataset_manager.current_arrow_table()
+    card("📁 Dataset Overview", function.display_dataset_overview, df, cat_cols, num_cols, profile, table, token)
+    spacer()
+    card("❌ Missing Values", function.display_missing_values, df, profile)
+    spacer()
+
+    def statistics_and_types():
+        function.display_statistics_visualization(df, cat_cols, num_cols, profile)
+        function.display_data_types(df, profile)
+
+    card("📊 Statistics & Types", statistics_and_types)
 
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("🔗 Categorical Variable Analysis")
+
+def exploration_visualization_section(df, cat_cols, num_cols, profile):
+    card("📈 Feature Distributions", function.display_individual_feature_distribution, df, num_cols, profile)
+    spacer()
+
+    def categorical_analysis():
         if cat_cols:
-            function.categorical_variable_analysis(df, cat_cols)
+            function.categorical_variable_analysis(df, cat_cols, profile)
         else:
             st.info("No categorical columns available.")
-        st.markdown("</div>", unsafe_allow_html=True)
+
+    card("🔗 Categorical Variable Analysis", categorical_analysis)
+    spacer()
+
+    def categorical_numerical_analysis():
+        if cat_cols and num_cols:
+            function.categorical_numerical_variable_analysis(df, cat_cols, num_cols, profile)
+        else:
+            st.info("Needs at least one categorical and one numerical column.")
+
+    card("🧮 Categorical vs Numerical", categorical_numerical_analysis)
+
 
 # -------------------------
-# DATA PREPROCESSING
+# Data Preprocessing sections
 # -------------------------
-if selected == "Data Preprocessing":
 
-    new_df = st.session_state["new_df"]
-    st.header("🛠 Data Preprocessing")
+@st.fragment
+def missing_values_section(new_df):
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+    st.subheader("Missing Values")
 
-    tabs = st.tabs(["🧩 Missing Values", "🧠 Encoding", "📏 Scaling", "📈 Outliers", "🧾 Column Ops"])
+    profile = dataset_manager.current_profile()
+    function.display_missing_values(new_df, profile)
 
-    # MISSING VALUES TAB
-    with tabs[0]:
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("Missing Values")
+    catalog = profile.catalog(new_df)
 
-        function.display_missing_values(new_df)
+    cols_fill = column_picker("Select columns to fill:", catalog, key="fill_cols")
+    fill_method = st.selectbox("Method:", ["mean", "median", "mode"])
 
-        col_list = new_df.columns.tolist()
+    if st.button("Apply Fill"):
+        dataset_manager.store_dataset(preprocessing_function.fill_missing_data(new_df.copy(deep=False), cols_fill, fill_method), f"Fill {fill_method}: {', '.join(cols_fill)}", columns=cols_fill)
+        st.success(f"Missing values filled using {fill_method}")
+        st.rerun() # Added rerun for immediate update
 
-        cols_fill = st.multiselect("Select columns to fill:", col_list)
-        fill_method = st.selectbox("Method:", ["mean", "median", "mode"])
+    remove_cols = column_picker("Drop rows where selected columns have missing:", catalog, key="drop_rows_cols")
 
-        if st.button("Apply Fill"):
-            st.session_state["new_df"] = preprocessing_function.fill_missing_data(new_df.copy(), cols_fill, fill_method)
-            st.success(f"Missing values filled using {fill_method}")
-            st.rerun() # Added rerun for immediate update
+    if st.button("Drop Rows"):
+        dataset_manager.store_dataset(preprocessing_function.remove_rows_with_missing_data(new_df.copy(deep=False), remove_cols), "Drop rows with missing values", rows=True)
+        st.success("Rows dropped.")
+        st.rerun() # Added rerun for immediate update
+
+    st.markdown("</div>", unsafe_allow_html=True)
 
-        remove_cols = st.multiselect("Drop rows where selected columns have missing:", col_list)
 
-        if st.button("Drop Rows"):
-            st.session_state["new_df"] = preprocessing_function.remove_rows_with_missing_data(new_df.copy(), remove_cols)
-            st.success("Rows dropped.")
+@st.fragment
+def encoding_section(new_df):
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+    st.subheader("Encoding")
+
+    catalog = dataset_manager.current_profile().catalog(new_df)
+
+    if len(catalog.search(text=True)):
+        enc_choice = st.radio("Encoding method:", ["Label Encoding", "One Hot Encoding"])
+        sel_cols = column_picker("Select columns", catalog, key="encode_cols", text=True)
+
+        if enc_choice == "Label Encoding" and st.button("Apply Label Encoding"):
+            dataset_manager.store_dataset(preprocessing_function.label_encode(new_df.copy(deep=False), sel_cols), "Label encoding", columns=sel_cols)
+            st.success("Label Encoding applied.")
             st.rerun() # Added rerun for immediate update
 
-        st.markdown("</div>", unsafe_allow_html=True)
+        if enc_choice == "One Hot Encoding" and st.button("Apply One Hot Encoding"):
+            dataset_manager.store_dataset(preprocessing_function.one_hot_encode(new_df.copy(deep=False), sel_cols), "One hot encoding", columns=sel_cols)
+            st.success("One Hot Encoding applied.")
+            st.rerun() # Added rerun for immediate update
+    else:
+        st.info("No categorical columns found.")
 
-    # ENCODING TAB
-    with tabs[1]:
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-        st.subheader("Encoding")
+    st.markdown("</div>", unsafe_allow_html=True)
 
-        cat_cols = new_df.select_dtypes(include=['object', 'category']).columns.tolist()
 
-        if cat_cols:
-            enc_choice = st.radio("Encoding method:", ["Label Encoding", "One Hot Encoding"])
-            sel_cols = st.multiselect("Select columns", cat_cols)
-
-            if enc_choice == "Label Encoding" and st.button("Apply Label Encoding"):
-                st.session_state["new_df"] = preprocessing_function.label_encode(new_df.copy(), sel_cols)
-                st.success("Label Encoding applied.")
-                st.rerun() # Added rerun for immediate update
-
-            if enc_choice == "One Hot Encoding" and st.button("Apply One Hot Encoding"):
-                st.session_state["new_df"] = preprocessing_function.one_hot_encode(new_df.copy(), sel_cols)
-                st.success("One Hot Encoding applied.")
-                st.rerun() # Added rerun for immediate update
+@st.fragment
+def scaling_section(new_df):
+    st.subheader("Scaling")
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+
+    catalog = dataset_manager.current_profile().catalog(new_df)
+
+    cols_scale = column_picker("Select columns:", catalog, key="scale_cols", numeric=True)
+    scale_method = st.selectbox("Method:", ["Standardization", "Min-Max"])
+
+    if st.button("Apply Scaling"):
+        if scale_method == "Standardization":
+            dataset_manager.store_dataset(preprocessing_function.standard_scale(new_df.copy(deep=False), cols_scale), "Standardization", columns=cols_scale)
         else:
-            st.info("No categorical columns found.")
+            dataset_manager.store_dataset(preprocessing_function.min_max_scale(new_df.copy(deep=False), cols_scale), "Min-Max scaling", columns=cols_scale)
+        st.success(f"{scale_method} applied.")
+        st.rerun() # Added rerun for immediate update
 
-        st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
 
-    # SCALING TAB
-    with tabs[2]:
-        st.subheader("Scaling")
-        st.markdown("<div class'app-card'>", unsafe_allow_html=True)
 
-        numeric_cols = new_df.select_dtypes(include=['number']).columns.tolist()
+def outlier_quartiles(new_df, column):
+    # Sketched quartiles for very large frames; None keeps the exact np.percentile pass.
+    if len(new_df) < sketches.SKETCH_MIN_ROWS:
+        return None
+    return dataset_manager.current_profile().quartiles(new_df, column)
 
-        cols_scale = st.multiselect("Select columns:", numeric_cols)
-        scale_method = st.selectbox("Method:", ["Standardization", "Min-Max"])
 
-        if st.button("Apply Scaling"):
-            if scale_method == "Standardization":
-                st.session_state["new_df"] = preprocessing_function.standard_scale(new_df.copy(), cols_scale)
-            else:
-                st.session_state["new_df"] = preprocessing_function.min_max_scale(new_df.copy(), cols_scale)
-            st.success(f"{scale_method} applied.")
-            st.rerun() # Added rerun for immediate update
+@st.fragment
+def outliers_section(new_df):
+    st.subheader("Outliers")
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
 
-        st.markdown("</div>", unsafe_allow_html=True)
+    catalog = dataset_manager.current_profile().catalog(new_df)
 
-    # OUTLIERS TAB
-    with tabs[3]:
-        st.subheader("Outliers")
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+    out_col = column_picker("Select column", catalog, key="outlier_col", multi=False, numeric=True)
+    detect_method = st.radio("Detection Method", ["IQR", "Z-Score"])
 
-        numeric_cols = new_df.select_dtypes(include=['number']).columns.tolist()
+    if st.button("Detect"):
+        if detect_method == "IQR":
+            outliers = preprocessing_function.detect_outliers_iqr(new_df, out_col, outlier_quartiles(new_df, out_col))
+        else:
+            outliers = preprocessing_function.detect_outliers_zscore(new_df, out_col)
+        st.write(outliers[:200])
 
-        out_col = st.selectbox("Select column", numeric_cols)
-        detect_method = st.radio("Detection Method", ["IQR", "Z-Score"])
+    handle = st.selectbox("Handle outliers:", ["None", "Remove", "Replace with Median"])
 
-        if st.button("Detect"):
-            if detect_method == "IQR":
-                outliers = preprocessing_function.detect_outliers_iqr(new_df.copy(), out_col)
-            else:
-                outliers = preprocessing_function.detect_outliers_zscore(new_df.copy(), out_col)
-            st.write(outliers[:200])
+    if handle != "None" and st.button("Apply Handling"):
+        outliers = preprocessing_function.detect_outliers_iqr(new_df, out_col, outlier_quartiles(new_df, out_col))
+        if handle == "Remove":
+            dataset_manager.store_dataset(preprocessing_function.remove_outliers(new_df.copy(deep=False), out_col, outliers), f"Remove outliers in {out_col}", rows=True)
+            st.success("Outliers removed.")
+        else:
+            dataset_manager.store_dataset(preprocessing_function.transform_outliers(new_df.copy(deep=False), out_col, outliers), f"Replace outliers in {out_col}", columns=[out_col])
+            st.success("Outliers replaced with median.")
+        st.rerun() # Added rerun for immediate update
 
-        handle = st.selectbox("Handle outliers:", ["None", "Remove", "Replace with Median"])
+    st.markdown("</div>", unsafe_allow_html=True)
 
-        if handle != "None" and st.button("Apply Handling"):
-            outliers = preprocessing_function.detect_outliers_iqr(new_df.copy(), out_col)
-            if handle == "Remove":
-                st.session_state["new_df"] = preprocessing_function.remove_outliers(new_df.copy(), out_col, outliers)
-                st.success("Outliers removed.")
-            else:
-                st.session_state["new_df"] = preprocessing_function.transform_outliers(new_df.copy(), out_col, outliers)
-                st.success("Outliers replaced with median.")
+
+@st.fragment
+def column_ops_section(new_df):
+    st.subheader("Column Operations")
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+
+    catalog = dataset_manager.current_profile().catalog(new_df)
+
+    with st.expander("Rename Column"):
+        sel = column_picker("Select column", catalog, key="rename_sel", multi=False)
+        new = st.text_input("New name", key="rename_new")
+        if st.button("Rename"):
+            tmp = new_df.copy(deep=False)
+            tmp.rename(columns={sel: new}, inplace=True)
+            dataset_manager.store_dataset(tmp, f"Rename {sel} to {new}", renamed={sel: new})
+            st.success("Renamed.")
             st.rerun() # Added rerun for immediate update
 
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # COLUMN OPS TAB
-    with tabs[4]:
-        st.subheader("Column Operations")
-        st.markdown("<div class='app-card'>", unsafe_allow_html=True)
-
-        cols = new_df.columns.tolist()
-
-        with st.expander("Rename Column"):
-            sel = st.selectbox("Select column", cols, key="rename_sel")
-            new = st.text_input("New name", key="rename_new")
-            if st.button("Rename"):
-                tmp = new_df.copy()
-                tmp.rename(columns={sel: new}, inplace=True)
-                st.session_state["new_df"] = tmp
-                st.success("Renamed.")
-                st.rerun() # Added rerun for immediate update
-
-        with st.expander("Change Type"):
-            sel = st.selectbox("Column", cols, key="type_sel")
-            dtype = st.selectbox("New Type", ["int", "float", "string"], key="type_new")
-            if st.button("Convert"):
-                tmp = new_df.copy()
-                tmp[sel] = tmp[sel].astype(dtype)
-                st.session_state["new_df"] = tmp
-                st.success("Converted.")
-                st.rerun() # Added rerun for immediate update
-
-        with st.expander("Drop Duplicates"):
-            if st.button("Drop"):
-                tmp = new_df.copy().drop_duplicates()
-                st.session_state["new_df"] = tmp
-                st.success("Duplicates removed.")
-                st.rerun() # Added rerun for immediate update
-
-        st.markdown("</div>", unsafe_allow_html=True)
-    
-    # --- DOWNLOAD SECTION (with key fix) ---
-    
+    with st.expander("Change Type"):
+        sel = column_picker("Column", catalog, key="type_sel", multi=False)
+        dtype = st.selectbox("New Type", ["int", "float", "string"], key="type_new")
+        if st.button("Convert"):
+            tmp = new_df.copy(deep=False)
+            tmp[sel] = tmp[sel].astype(dtype)
+            dataset_manager.store_dataset(tmp, f"Convert {sel} to {dtype}", columns=[sel])
+            st.success("Converted.")
+            st.rerun() # Added rerun for immediate update
+
+    with st.expander("Drop Duplicates"):
+        if st.button("Drop"):
+            tmp = new_df.copy(deep=False).drop_duplicates()
+            dataset_manager.store_dataset(tmp, "Drop duplicates", rows=True)
+            st.success("Duplicates removed.")
+            st.rerun() # Added rerun for immediate update
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.fragment
+def compare_versions_section(new_df):
+    st.subheader("Compare Versions")
+    versions = dataset_manager.session_versions()
+    if len(versions) < 2:
+        st.info("Apply a preprocessing step to have two versions to compare.")
+        return
+
+    labels = {row.Version: f"v{row.Version}: {row.Step}" for row in versions.itertuples()}
+    numbers = list(labels)
+    cols = st.columns(2)
+    before = cols[0].selectbox("Before", numbers, index=len(numbers) - 2, format_func=labels.get, key="diff_before")
+    after = cols[1].selectbox("After", numbers, index=len(numbers) - 1, format_func=labels.get, key="diff_after")
+
+    if st.button("Compare"):
+        old_df, old_profile = dataset_manager.dataset_version(before)
+        df, profile = dataset_manager.dataset_version(after)
+        try:
+            diff = version_diff.diff_versions(old_df, df, old_profile.checksums, profile.checksums, old_profile, profile)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        # Kept so the result stays on screen while its display options change.
+        st.session_state["version_diff"] = ((before, after), diff)
+
+    compared = st.session_state.get("version_diff")
+    if compared is not None and compared[0] == (before, after):
+        version_diff.show_version_diff(compared[1])
+
+
+@st.fragment
+def download_section(new_df):
     st.subheader("Preview & Download")
-    st.dataframe(st.session_state["new_df"].head(10))
+    table, token = dataset_manager.current_arrow_table()
+    show_paged_preview(table if table is not None else new_df, key="processed_preview", token=token,
+                       default_page_size=10)
+
+    # The CSV is only serialized when the user asks for it instead of on
+    # every rerun of the preprocessing page.
+    if st.button("Prepare CSV"):
+        csv = new_df.to_csv(index=False)
+
+        # Add a 'key' to the button.
+        # The key changes whenever the number of rows/columns changes,
+        # forcing Streamlit to create a new button with the new data.
+        st.download_button(
+            "⬇️ Download Processed Data",
+            csv,
+            "processed_data.csv",
+            key=f"download-csv-{new_df.shape}"
+        )
 
-    # First, get the final dataframe from session state
-    df_to_download = st.session_state["new_df"]
 
-    # Convert it to CSV
-    csv = df_to_download.to_csv(index=False)
+# -------------------------
+# DATA EXPLORATION
+# -------------------------
+if selected == "Data Exploration":
+    df = dataset_manager.current_dataset()
+    profile = dataset_manager.current_profile()
+    num_cols, cat_cols = function.categorical_numerical(df, profile)
 
-    # Add a 'key' to the button.
-    # The key changes whenever the number of rows/columns changes,
-    # forcing Streamlit to create a new button with the new data.
-    st.download_button(
-        "⬇️ Download Processed Data",
-        csv,
-        "processed_data.csv",
-        key=f"download-csv-{df_to_download.shape}"
-    )
-    # --- END OF DOWNLOAD SECTION ---
+    section = section_selector(["📊 Overview", "🔍 Visualization", "⏱ Time Series"], key="exploration_section")
+
+    if section == "📊 Overview":
+        exploration_overview_section(df, cat_cols, num_cols, profile)
+    elif section == "🔍 Visualization":
+        exploration_visualization_section(df, cat_cols, num_cols, profile)
+    else:
+        card("⏱ Time Series", function.display_time_series, df, profile)
+
+# -------------------------
+# DATA PREPROCESSING
+# -------------------------
+if selected == "Data Preprocessing":
+
+    new_df = dataset_manager.current_dataset()
+    st.header("🛠 Data Preprocessing")
+
+    preprocessing_sections = {
+        "🧩 Missing Values": missing_values_section,
+        "🧠 Encoding": encoding_section,
+        "📏 Scaling": scaling_section,
+        "📈 Outliers": outliers_section,
+        "🧾 Column Ops": column_ops_section,
+        "🔀 Compare Versions": compare_versions_section,
+        "⬇️ Preview & Download": download_section,
+    }
+    section = section_selector(list(preprocessing_sections), key="preprocessing_section")
+    preprocessing_sections[section](new_df)
 
 
 # -------------------------
 # ADVANCED EDA
 # -------------------------
 if selected == "Advanced EDA":
-    df = st.session_state["new_df"]
+    df = dataset_manager.current_dataset()
 
     st.header("🧠 Advanced EDA")
 
     st.markdown("<div class='app-card'>", unsafe_allow_html=True)
     st.subheader("📌 Enhanced Statistical Summary")
-    advanced_analysis.show_statistical_summary(df)
+    advanced_analysis.show_statistical_summary(df, dataset_manager.current_profile())
     st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
     st.markdown("<div class='app-card'>", unsafe_allow_html=True)
     st.subheader("📌 Correlation & Bivariate Analysis")
-    advanced_analysis.show_correlation_analysis(df)
+    advanced_analysis.show_correlation_analysis(df, dataset_manager.current_profile())
     st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("<div style='height:1Date_Time_Conversion_Functions12px'></div>", unsafe_allow_html=True)
@@ -326,4 +499,12 @@ if selected == "Advanced EDA":
     st.markdown("<div class='app-card'>", unsafe_allow_html=True)
     st.subheader("📌 Advanced Missing Value Report")
     advanced_analysis.show_missing_value_report(df)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    spacer()
+
+    st.markdown("<div class='app-card'>", unsafe_allow_html=True)
+    st.subheader("📌 Data Quality Rules")
+    _, token = dataset_manager.current_arrow_table()
+    quality_rules.show_quality_rules(df, dataset_manager.current_profile(), token)
     st.markdown("</div>", unsafe_allow_html=True)
\ No newline at end of file
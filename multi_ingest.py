@@ -0,0 +1,231 @@
+# multi_ingest.py
+'''Parallel ingestion of many CSV files into one dataset.
+
+Sources are paths, glob patterns ("data/2024-*.csv"), uploaded files or
+(name, bytes) pairs. Ingestion runs in two passes over a thread pool:
+
+1. every file's header and first SCHEMA_SAMPLE_ROWS rows are read and the
+   schemas reconciled (union of columns, dtype promotion); a conflict stops
+   here, before any file is parsed in full,
+2. the files are parsed and sketched (see sketches.read_csv_sketched); each
+   finished file is checked against the schema again, and on a conflict the
+   files not yet started are cancelled.
+
+The frames are then concatenated with a SOURCE_COLUMN naming the file of
+every row, or joined on a key column (pandas merges are hash joins).
+
+    EDA_INGEST_WORKERS  parser threads (default: number of CPUs)
+'''
+from __future__ import annotations
+
+import glob
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import reduce
+
+import sketches
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+INGEST_WORKERS = int(os.environ.get("EDA_INGEST_WORKERS", 0)) or os.cpu_count() or 1
+
+SCHEMA_SAMPLE_ROWS = 1000
+
+SOURCE_COLUMN = "source_file"
+
+JOIN_TYPES = ["inner", "left", "outer"]
+
+
+class SchemaConflict(ValueError):
+    """Raised when files cannot be combined into one schema."""
+
+
+def is_many(file) -> bool:
+    """True for a list of files or a glob pattern, which load_many handles."""
+    return isinstance(file, (list, tuple)) or (isinstance(file, str) and glob.has_magic(file))
+
+
+def expand_sources(files) -> list:
+    """Return [(name, source)] with glob patterns expanded, in a stable order."""
+    files = [files] if isinstance(files, (str, os.PathLike)) else list(files)
+    sources = []
+    for file in files:
+        if isinstance(file, tuple):
+            sources.append(file)
+        elif isinstance(file, str) and glob.has_magic(file):
+            matches = sorted(glob.glob(file))
+            if not matches:
+                raise FileNotFoundError(f"No files match {file}")
+            sources.extend((os.path.basename(path), path) for path in matches)
+        elif isinstance(file, (str, os.PathLike)):
+            sources.append((os.path.basename(file), file))
+        else:
+            sources.append((file.name, file))  # an uploaded file
+    return sources
+
+
+def _readable(source):
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if hasattr(source, "getvalue"):
+        return io.BytesIO(source.getvalue())
+    return source
+
+
+def frame_schema(df: pd.DataFrame) -> pd.Series:
+    """Return the column dtypes, None for columns without a single value (any type fits)."""
+    dtypes = df.dtypes.astype(object)
+    dtypes[df.isna().all().to_numpy()] = None
+    return dtypes
+
+
+def read_schema(source, rows: int = SCHEMA_SAMPLE_ROWS) -> pd.Series:
+    """Return the column dtypes inferred from the first `rows` rows."""
+    return frame_schema(pd.read_csv(_readable(source), nrows=rows))
+
+
+def _numeric(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def promote(left, right):
+    """Return the dtype both columns fit in, or None if they conflict.
+
+    Numbers promote to the wider numeric type and any other mix of
+    non-numeric types to object; numbers and text conflict.
+    """
+    if left is None or right is None or left == right:
+        return right if left is None else left
+    if _numeric(left) and _numeric(right):
+        return np.promote_types(left, right)
+    if not _numeric(left) and not _numeric(right):
+        return np.dtype(object)
+    return None
+
+
+def reconcile(schemas: dict, key=None, strict_columns: bool = False) -> dict:
+    """Combine {file: dtypes} into one {column: dtype}, in first-seen column order.
+
+    Raises SchemaConflict for incompatible dtypes, a missing join key, or
+    (with strict_columns) files with different columns.
+    """
+    combined, first = {}, None
+    for name, dtypes in schemas.items():
+        if key is not None and key not in dtypes.index:
+            raise SchemaConflict(f"{name} has no key column {key!r}")
+        if strict_columns:
+            if first is None:
+                first = (name, list(dtypes.index))
+            elif sorted(map(str, dtypes.index)) != sorted(map(str, first[1])):
+                raise SchemaConflict(f"{name} has different columns than {first[0]}")
+        for column, dtype in dtypes.items():
+            if column not in combined:
+                combined[column] = dtype
+                continue
+            promoted = promote(combined[column], dtype)
+            if promoted is None:
+                raise SchemaConflict(f"Column {column!r} is {dtype} in {name} but {combined[column]} in earlier files")
+            combined[column] = promoted
+    return combined
+
+
+def _parse(source):
+    return sketches.read_csv_sketched(_readable(source))
+
+
+def _concat(frames: dict, file_sketches: dict, schema: dict):
+    parts = []
+    for name, df in frames.items():
+        # Columns without a value in this file are left for pd.concat to
+        # promote: casting their NaNs to int or bool would fail or invent values.
+        dtypes = frame_schema(df)
+        casts = {col: schema[col] for col in df.columns
+                 if schema[col] is not None and dtypes[col] is not None and df[col].dtype != schema[col]}
+        parts.append(df.astype(casts) if casts else df)
+    combined = pd.concat(parts, ignore_index=True)
+    combined[SOURCE_COLUMN] = pd.Categorical(np.repeat(list(frames), [len(df) for df in frames.values()]),
+                                             categories=list(frames))
+
+    # Per-file sketches merge into sketches of the combined columns; rows of
+    # files that lack a column count as missing values of it.
+    merged = {}
+    if not all(file_sketches[name] or not len(df.columns) for name, df in frames.items()):
+        # A file too wide to sketch while parsing: columns are sketched on demand instead.
+        return combined, merged
+    for name, partial in file_sketches.items():
+        sketches.merge_sketches(merged, partial)
+    for column, sketch in merged.items():
+        absent = sum(len(df) for df in frames.values() if column not in df.columns)
+        sketch.rows += absent
+        sketch.missing += absent
+        if sketch.numeric and not sketches.is_numeric_column(combined[column]):
+            sketch.numeric, sketch.quantiles = False, None
+    return combined, merged
+
+
+def _join(frames: dict, key, how: str):
+    def merge(left, item):
+        name, right = item
+        stem = os.path.splitext(name)[0]
+        overlap = {col: f"{col}_{stem}" for col in right.columns if col != key and col in left.columns}
+        return left.merge(right.rename(columns=overlap), on=key, how=how)
+
+    items = list(frames.items())
+    return reduce(merge, items[1:], items[0][1])
+
+
+def load_many(files, key=None, how: str = "outer", strict_columns: bool = False,
+              workers: int = None, progress=None):
+    """Parse many files in parallel and combine them into one frame.
+
+    Without `key` the files are concatenated with a SOURCE_COLUMN; with it
+    they are joined on that column (`how` is one of JOIN_TYPES).
+    `progress(name, status, done, total)` is called from the calling thread
+    as files finish. Returns (frame, {column: ColumnSketch} or None).
+    """
+    sources = expand_sources(files)
+    if not sources:
+        raise FileNotFoundError("No files to load")
+    names = [name for name, _ in sources]
+    if len(set(names)) != len(names):
+        # Same file name in different directories: keep every source distinct.
+        sources = [(f"{i}:{name}", source) for i, (name, source) in enumerate(sources)]
+    workers = min(workers or INGEST_WORKERS, len(sources))
+    total = len(sources)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = dict(zip([name for name, _ in sources], pool.map(lambda item: read_schema(item[1]), sources)))
+        schema = reconcile(samples, key, strict_columns)
+
+        futures = {pool.submit(_parse, source): name for name, source in sources}
+        frames, file_sketches = {}, {}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                df, partial = future.result()
+                # Rows past the sample can still change a column's dtype.
+                schema = reconcile({"schema": pd.Series(schema, dtype=object), name: frame_schema(df)}, key)
+                frames[name], file_sketches[name] = df, partial
+                if progress is not None:
+                    progress(name, f"{len(df)} rows", done, total)
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    # Keep the order of the sources, not of completion.
+    frames = {name: frames[name] for name, _ in sources}
+    file_sketches = {name: file_sketches[name] for name, _ in sources}
+    if key is None:
+        return _concat(frames, file_sketches, schema)
+    return _join(frames, key, how), None
+
+
+def common_columns(files) -> list:
+    """Columns present in every file, from the headers only (join key candidates)."""
+    sources = expand_sources(files)
+    headers = [list(pd.read_csv(_readable(source), nrows=0).columns) for _, source in sources]
+    return [col for col in headers[0] if all(col in header for header in headers[1:])] if headers else []
@@ -0,0 +1,45 @@
+# parallel_stats.py
+'''Column-parallel execution of per-column statistics for wide tables.
+
+Columns are split into contiguous chunks that worker threads process one
+Series at a time. Threads read the frame's own buffers, so nothing is pickled
+or copied per worker, and the numeric kernels behind pandas reductions release
+the GIL for most of their work. Results come back in column order so callers
+can assemble the same tables as the sequential code.
+
+    EDA_STAT_WORKERS  worker threads (default: number of CPUs, 1 disables)
+'''
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+STAT_WORKERS = int(os.environ.get("EDA_STAT_WORKERS", 0)) or os.cpu_count() or 1
+
+# Below this many columns the thread hand-off costs more than it saves.
+PARALLEL_MIN_COLUMNS = 64
+
+# Chunks per worker, so a few slow columns do not leave the other workers idle.
+CHUNKS_PER_WORKER = 4
+
+
+def column_chunks(columns: list, workers: int) -> list:
+    """Split columns into contiguous chunks, CHUNKS_PER_WORKER per worker."""
+    size = max(1, -(-len(columns) // (workers * CHUNKS_PER_WORKER)))
+    return [columns[i:i + size] for i in range(0, len(columns), size)]
+
+
+def map_columns(df, columns, func, workers: int = None) -> list:
+    """Return [func(name, df[name]) for name in columns], computed across worker threads."""
+    columns = list(columns)
+    workers = workers or STAT_WORKERS
+
+    def run(chunk):
+        return [func(name, df[name]) for name in chunk]
+
+    if workers <= 1 or len(columns) < PARALLEL_MIN_COLUMNS:
+        return run(columns)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = []
+        for chunk_results in pool.map(run, column_chunks(columns, workers)):
+            results.extend(chunk_results)
+    return results
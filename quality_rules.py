@@ -0,0 +1,341 @@
+# quality_rules.py
+'''Declarative data-quality rules checked in one vectorized pass.
+
+Rules are plain dicts (and so load from JSON):
+
+    {"rule": "not_null",      "column": "Age"}
+    {"rule": "null_fraction", "column": "Cabin", "max": 0.5}
+    {"rule": "range",         "column": "Fare", "min": 0, "max": 600}
+    {"rule": "regex",         "column": "Ticket", "pattern": "[A-Z0-9 ./]+"}
+    {"rule": "allowed",       "column": "Sex", "values": ["male", "female"]}
+    {"rule": "unique",        "columns": ["PassengerId"]}
+    {"rule": "compare",       "column": "SibSp", "op": "<=", "other": "Parch"}
+
+Every rule may carry a "name". compile_rules() checks them against the columns
+once; check_quality() then reads each chunk of rows once and evaluates every
+rule on it with vectorized masks (null masks shared between rules). Rules that
+need the whole dataset keep running state: null counts for null_fraction and
+the hashes of values seen so far for unique, so a value repeated in a later
+chunk is still caught. A DataFrame is processed in row slices, a CSV file in
+chunks as it is read, so files larger than memory can be checked too.
+
+Offending rows are sampled per rule with a bottom-k random sample, which is
+uniform over all violations whichever chunk they came from.
+'''
+from __future__ import annotations
+
+import json
+import operator
+import os
+import re
+from collections import namedtuple
+
+import streamlit as st
+
+from column_catalog import column_picker
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+CHUNK_ROWS = int(os.environ.get("EDA_QUALITY_CHUNK_ROWS", 200_000))
+
+SAMPLE_ROWS = 20
+
+RULE_TYPES = ["not_null", "null_fraction", "range", "regex", "allowed", "unique", "compare"]
+
+COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+               "==": operator.eq, "!=": operator.ne}
+
+# summary: one row per rule; samples: rule name -> sampled offending rows.
+QualityReport = namedtuple("QualityReport", ["summary", "samples"])
+
+
+def load_rules(rules):
+    """Accept a list of rule dicts, a JSON string or the path of a JSON file."""
+    if isinstance(rules, str):
+        if os.path.exists(rules):
+            with open(rules) as f:
+                return json.load(f)
+        return json.loads(rules)
+    return list(rules)
+
+
+def describe_rule(spec: dict) -> str:
+    kind, columns = spec["rule"], ", ".join(map(str, _rule_columns(spec)))
+    details = {
+        "null_fraction": lambda: f"nulls <= {spec.get('max', 0):.0%}",
+        "range": lambda: f"in [{spec.get('min', '-inf')}, {spec.get('max', 'inf')}]",
+        "regex": lambda: f"matches {spec.get('pattern')}",
+        "allowed": lambda: f"in {len(spec.get('values', []))} allowed values",
+        "compare": lambda: f"{spec.get('op')} {spec.get('other')}",
+    }
+    detail = details[kind]() if kind in details else kind.replace("_", " ")
+    return f"{columns}: {detail}"
+
+
+def _rule_columns(spec: dict) -> list:
+    columns = spec.get("columns") or [spec.get("column")]
+    if spec.get("rule") == "compare":
+        columns = columns + [spec.get("other")]
+    return columns
+
+
+class CompiledRule:
+    """One validated rule with its running counts and sample of offending rows."""
+
+    def __init__(self, spec: dict, rng):
+        self.spec = spec
+        self.kind = spec["rule"]
+        self.name = spec.get("name") or describe_rule(spec)
+        self.columns = _rule_columns(spec)
+        self.rows = 0
+        self.violations = 0
+        self.error = None
+        self._rng = rng
+        self._sample_keys = np.empty(0)
+        self._sample = None
+        self._seen = np.empty(0, dtype=np.uint64)  # unique: hashes of values seen so far
+        if self.kind == "regex":
+            re.compile(spec["pattern"])  # fail on an invalid pattern before any row is read
+        if self.kind == "compare":
+            self._compare = COMPARISONS[spec["op"]]
+
+    def violation_mask(self, chunk: pd.DataFrame, nulls: dict) -> np.ndarray:
+        """Return a boolean mask of the chunk rows violating the rule."""
+        column = self.columns[0]
+        values = chunk[column]
+        present = ~nulls[column]
+
+        if self.kind in ("not_null", "null_fraction"):
+            return nulls[column]
+        if self.kind == "range":
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            inside = np.ones(len(chunk), dtype=bool)
+            if self.spec.get("min") is not None:
+                inside &= numbers >= self.spec["min"]
+            if self.spec.get("max") is not None:
+                inside &= numbers <= self.spec["max"]
+            return present & ~inside  # non-numeric values compare False: violations
+        if self.kind == "regex":
+            matched = values.astype(str).str.fullmatch(self.spec["pattern"]).to_numpy(dtype=bool, na_value=False)
+            return present & ~matched
+        if self.kind == "allowed":
+            return present & ~values.isin(self.spec["values"]).to_numpy()
+        if self.kind == "compare":
+            other = self.spec["other"]
+            holds = self._compare(values, chunk[other]).to_numpy(dtype=bool, na_value=False)
+            return present & ~nulls[other] & ~holds
+        if self.kind == "unique":
+            complete = np.logical_and.reduce([~nulls[col] for col in self.columns])
+            hashes = pd.util.hash_pandas_object(chunk[self.columns], index=False).to_numpy()
+            # Rows with a null in the key columns are not checked.
+            repeated = np.zeros(len(chunk), dtype=bool)
+            repeated[complete] = pd.Series(hashes[complete]).duplicated().to_numpy() | np.isin(hashes[complete], self._seen)
+            self._seen = np.union1d(self._seen, hashes[complete])
+            return repeated
+        raise ValueError(f"Unknown rule type {self.kind!r}")
+
+    def update(self, chunk: pd.DataFrame, nulls: dict):
+        if self.error is not None:
+            return
+        try:
+            mask = self.violation_mask(chunk, nulls)
+        except (TypeError, ValueError) as e:
+            # e.g. comparing text with numbers: report it and skip the rule from here on.
+            self.error = str(e)
+            return
+        self.rows += len(chunk)
+        hits = np.flatnonzero(mask)
+        self.violations += len(hits)
+        if len(hits):
+            # Bottom-k sample: keep the SAMPLE_ROWS offending rows with the smallest random keys.
+            keys = np.concatenate([self._sample_keys, self._rng.random(len(hits))])
+            rows = chunk.iloc[hits] if self._sample is None else pd.concat([self._sample, chunk.iloc[hits]])
+            keep = np.argsort(keys, kind="stable")[:SAMPLE_ROWS]
+            self._sample_keys, self._sample = keys[keep], rows.iloc[keep]
+
+    @property
+    def passed(self) -> bool:
+        if self.kind == "null_fraction":
+            return self.rows == 0 or self.violations / self.rows <= self.spec.get("max", 0)
+        return self.violations == 0
+
+    def sample(self) -> pd.DataFrame:
+        if self._sample is None or self.passed:
+            return None
+        return self._sample.sort_index()
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _option_error(spec: dict):
+    """Return what is wrong with the rule-specific keys of a spec, or None."""
+    kind = spec["rule"]
+    if kind == "null_fraction" and not (_is_number(spec.get("max")) and 0 <= spec["max"] <= 1):
+        return "null_fraction needs a numeric max between 0 and 1"
+    if kind == "range":
+        bounds = [spec.get(bound) for bound in ("min", "max") if spec.get(bound) is not None]
+        if not bounds or not all(map(_is_number, bounds)):
+            return "range needs a numeric min, max or both"
+    if kind == "regex" and not isinstance(spec.get("pattern"), str):
+        return "regex needs a pattern string"
+    if kind == "allowed" and not isinstance(spec.get("values"), list):
+        return "allowed needs a list of values"
+    if kind == "compare" and spec.get("op") not in COMPARISONS:
+        return f"op must be one of {', '.join(COMPARISONS)}"
+    return None
+
+
+def compile_rules(rules, columns) -> list:
+    """Validate rule specs against the dataset columns and compile them.
+
+    Raises ValueError naming the first invalid rule.
+    """
+    rng = np.random.default_rng(0)
+    compiled = []
+    for position, spec in enumerate(load_rules(rules), start=1):
+        kind = spec.get("rule")
+        if kind not in RULE_TYPES:
+            raise ValueError(f"Rule {position}: unknown rule type {kind!r}")
+        missing = [col for col in _rule_columns(spec) if col not in columns]
+        if missing:
+            raise ValueError(f"Rule {position}: no column {missing[0]!r}")
+        error = _option_error(spec)
+        if error:
+            raise ValueError(f"Rule {position}: {error}")
+        try:
+            compiled.append(CompiledRule(spec, rng))
+        except (re.error, KeyError) as e:
+            raise ValueError(f"Rule {position}: {e}") from e
+    return compiled
+
+
+def _chunks(data, chunk_rows: int):
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_rows):
+            yield data.iloc[start:start + chunk_rows]
+    else:
+        yield from pd.read_csv(data, chunksize=chunk_rows)
+
+
+def check_quality(data, rules, chunk_rows: int = CHUNK_ROWS) -> QualityReport:
+    """Check rules against a DataFrame, or a CSV path/file read chunk by chunk.
+
+    Usable without Streamlit, e.g. in a scheduled job:
+        report = check_quality("events.csv", "rules.json")
+        failed = report.summary[~report.summary["Passed"]]
+    """
+    compiled = None
+    for chunk in _chunks(data, chunk_rows):
+        if compiled is None:
+            compiled = compile_rules(rules, chunk.columns)
+            needed = {col for rule in compiled for col in rule.columns}
+        nulls = {col: chunk[col].isna().to_numpy() for col in needed}
+        for rule in compiled:
+            rule.update(chunk, nulls)
+
+    rows = []
+    for rule in compiled or []:
+        share = rule.violations / rule.rows * 100 if rule.rows else 0.0
+        rows.append([rule.name, rule.kind, ", ".join(map(str, rule.columns)), rule.rows, rule.violations,
+                     round(share, 2), rule.error is None and rule.passed, rule.error])
+    summary = pd.DataFrame(rows, columns=["Rule", "Type", "Columns", "Checked rows", "Violations",
+                                          "Violation %", "Passed", "Error"])
+    samples = {rule.name: rule.sample() for rule in compiled or [] if rule.sample() is not None}
+    return QualityReport(summary, samples)
+
+
+# -----------------------------
+# Streamlit widgets
+# -----------------------------
+
+def _rule_form(df: pd.DataFrame, catalog) -> dict:
+    kind = st.selectbox("Rule type", RULE_TYPES, key="quality_rule_type")
+    if kind == "unique":
+        spec = {"rule": kind, "columns": column_picker("Columns", catalog, key="quality_rule_columns")}
+    else:
+        spec = {"rule": kind, "column": column_picker("Column", catalog, key="quality_rule_column", multi=False)}
+
+    if kind == "null_fraction":
+        spec["max"] = st.slider("Largest allowed null share", 0.0, 1.0, 0.05, key="quality_rule_max_nulls")
+    elif kind == "range":
+        cols = st.columns(2)
+        low = cols[0].text_input("Minimum (empty for none)", key="quality_rule_min")
+        high = cols[1].text_input("Maximum (empty for none)", key="quality_rule_max")
+        spec["min"] = float(low) if low.strip() else None
+        spec["max"] = float(high) if high.strip() else None
+    elif kind == "regex":
+        spec["pattern"] = st.text_input("Pattern (must match the whole value)", key="quality_rule_pattern")
+    elif kind == "allowed":
+        text = st.text_area("Allowed values, one per line", key="quality_rule_values")
+        spec["values"] = [line.strip() for line in text.splitlines() if line.strip()]
+    elif kind == "compare":
+        spec["op"] = st.selectbox("Operator", list(COMPARISONS), key="quality_rule_op")
+        spec["other"] = column_picker("Other column", catalog, key="quality_rule_other", multi=False)
+    name = st.text_input("Name (optional)", key="quality_rule_name")
+    if name.strip():
+        spec["name"] = name.strip()
+    return spec
+
+
+def show_quality_rules(df: pd.DataFrame, profile, token=None):
+    """Render the rule editor, run the rules and show the violations.
+
+    `token` identifies the dataset version, so a report is only shown for
+    the data and rules it was computed from.
+    """
+    rules = st.session_state.setdefault("quality_rules", [])
+
+    with st.expander("Add a rule", expanded=not rules):
+        try:
+            spec = _rule_form(df, profile.catalog(df))
+        except ValueError as e:
+            st.error(f"Invalid value: {e}")
+            spec = None
+        if spec is not None and st.button("Add rule"):
+            try:
+                compile_rules([spec], df.columns)
+            except ValueError as e:
+                st.error(str(e).replace("Rule 1: ", ""))
+            else:
+                rules.append(spec)
+                st.session_state.pop("quality_rules_json", None)
+
+    with st.expander("Rules as JSON (edit, import or export)"):
+        text = st.text_area("Rules", json.dumps(rules, indent=2), height=200, key="quality_rules_json")
+        if st.button("Use these rules"):
+            try:
+                compile_rules(text, df.columns)
+            except (ValueError, json.JSONDecodeError) as e:
+                st.error(str(e))
+            else:
+                st.session_state["quality_rules"] = rules = load_rules(text)
+
+    if not rules:
+        st.info("No rules yet.")
+        return
+
+    st.dataframe(pd.DataFrame({"Rule": [spec.get("name") or describe_rule(spec) for spec in rules]}), hide_index=True)
+    cols = st.columns(2)
+    if cols[1].button("Clear rules"):
+        st.session_state["quality_rules"] = []
+        st.session_state.pop("quality_rules_json", None)
+        st.session_state.pop("quality_report", None)
+        st.rerun()
+    request = (token, json.dumps(rules, sort_keys=True))
+    if cols[0].button("Run checks"):
+        st.session_state["quality_report"] = (request, check_quality(df, rules))
+
+    stored = st.session_state.get("quality_report")
+    if stored is None or stored[0] != request:
+        return
+    report = stored[1]
+    failed = int((~report.summary["Passed"]).sum())
+    (st.error if failed else st.success)(f"{failed} of {len(report.summary)} rules failed.")
+    st.dataframe(report.summary, hide_index=True)
+    for name, sample in report.samples.items():
+        with st.expander(f"Sampled offending rows: {name}"):
+            st.dataframe(sample)
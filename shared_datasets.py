@@ -0,0 +1,173 @@
+# shared_datasets.py
+'''Server-wide, read-only registry of parsed datasets keyed by content fingerprint.
+
+When several sessions load the same file (or the example dataset) it is parsed
+once, written to an Arrow IPC file and memory-mapped. Every session attaches to
+the same pandas frame through a shallow copy; with pandas copy-on-write enabled
+a session only materializes the columns that one of its preprocessing steps
+actually modifies.
+
+The Arrow files are named after the fingerprint and PARSE_VERSION, so they
+also survive server restarts and skip parsing entirely for files seen before,
+but never outlive a change to how files are parsed. A file is deleted when its
+dataset is evicted from memory, and files of other parse versions are deleted
+when the registry starts, so the directory holds about max_datasets files.
+Datasets reused from a file have no parse-time sketches; their profiles
+sketch columns on demand.
+
+    EDA_SHARED_DIR           directory for the shared Arrow files (default <tmp>/eda_shared)
+    EDA_SHARED_MAX_DATASETS  parsed frames kept attached in memory (default 8)
+'''
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+
+import streamlit as st
+
+from dataset_manager import read_arrow, write_arrow
+from version_diff import VersionChecksums
+
+SHARED_DIR = os.environ.get("EDA_SHARED_DIR") or os.path.join(tempfile.gettempdir(), "eda_shared")
+SHARED_MAX_DATASETS = int(os.environ.get("EDA_SHARED_MAX_DATASETS", 8))
+
+# Bump whenever parsing changes what a loaded frame holds (dtypes, datetime
+# conversion, ...), so Arrow files written by older code are not reused.
+PARSE_VERSION = 3
+
+# frame: the read-only parsed frame; path: its Arrow file (None when Arrow
+# cannot store the frame and it is kept in memory only); sketches: the
+# per-column sketches built while parsing, or None when the file was not
+# parsed by this process (see sketches.read_csv_sketched); checksums: the
+# row hashes and column checksums every session's first version starts from
+# (see version_diff.VersionChecksums).
+SharedDataset = namedtuple("SharedDataset", ["frame", "path", "sketches", "checksums"])
+
+
+def fingerprint(data: bytes) -> str:
+    """Return a content fingerprint for the raw bytes of a file."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class SharedDatasetRegistry:
+    """Parse-once registry of read-only, memory-mapped frames."""
+
+    def __init__(self, directory=SHARED_DIR, max_datasets=SHARED_MAX_DATASETS):
+        self.directory = directory
+        self.max_datasets = max_datasets
+        self._lock = threading.Lock()
+        self._datasets = OrderedDict()  # fingerprint -> SharedDataset, least recently used first
+        self._parsing = {}  # fingerprint -> lock held while the first session parses it
+        self._remove_stale_files()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"v{PARSE_VERSION}-{key}.arrow")
+
+    def _remove_stale_files(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".arrow") and not name.startswith(f"v{PARSE_VERSION}-"):
+                _remove(os.path.join(self.directory, name))
+
+    def get(self, data: bytes, parse, key: str = None) -> SharedDataset:
+        """Return the SharedDataset for `data`, calling `parse(data)` only on first sight.
+
+        `parse` returns (frame, sketches). `key` defaults to the fingerprint
+        of `data`. The returned frame must be treated as read-only; use
+        attach() to get a session-private view.
+        """
+        key = key or fingerprint(data)
+        path = self.path(key)
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+            parse_lock = self._parsing.setdefault(key, threading.Lock())
+
+        # Concurrent loads of the same new file wait for a single parse.
+        try:
+            with parse_lock:
+                with self._lock:
+                    if key in self._datasets:
+                        return self._datasets[key]
+                dataset = self._parse(data, parse, path)
+                with self._lock:
+                    self._datasets[key] = dataset
+                    while len(self._datasets) > self.max_datasets:
+                        # Sessions still attached keep the mapped frame alive
+                        # after its file is deleted.
+                        _, evicted = self._datasets.popitem(last=False)
+                        if evicted.path is not None:
+                            _remove(evicted.path)
+                return dataset
+        finally:
+            with self._lock:
+                self._parsing.pop(key, None)
+
+    def _parse(self, data, parse, path) -> SharedDataset:
+        if os.path.exists(path):
+            frame = read_arrow(path)
+            return SharedDataset(frame, path, None, VersionChecksums.of(frame))
+        import pyarrow as pa
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        parsed, sketches = parse(data)
+        checksums = VersionChecksums.of(parsed)
+        try:
+            write_arrow(parsed, tmp_path)
+        except (pa.ArrowException, ValueError):
+            # Frames Arrow cannot represent (e.g. mixed-type object columns)
+            # are shared from memory only.
+            _remove(tmp_path)
+            return SharedDataset(parsed, None, sketches, checksums)
+        os.replace(tmp_path, path)
+        return SharedDataset(read_arrow(path), path, sketches, checksums)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@st.cache_resource
+def get_shared_registry() -> SharedDatasetRegistry:
+    """Return the registry shared by every session of this server process."""
+    return SharedDatasetRegistry()
+
+
+def attach(shared):
+    """Return a session-private view of a shared frame without copying any column."""
+    return shared.copy(deep=False)
+
+
+def load_shared(file, parse):
+    """Load an uploaded file or a path through the shared registry.
+
+    Returns (SharedDataset, session view).
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            data = f.read()
+    else:
+        data = file.getvalue()
+    dataset = get_shared_registry().get(data, parse)
+    return dataset, attach(dataset.frame)
+
+
+def load_shared_many(files, parse, options: str = ""):
+    """Load several uploaded files combined into one dataset through the shared registry.
+
+    `parse` gets [(name, bytes)]; `options` describes how they are combined
+    and is part of the key, so each combination is parsed once.
+    Returns (SharedDataset, session view).
+    """
+    data = [(file.name, file.getvalue()) for file in files]
+    parts = [options] + [f"{name}:{fingerprint(content)}" for name, content in data]
+    key = fingerprint("\n".join(parts).encode())
+    dataset = get_shared_registry().get(data, parse, key)
+    return dataset, attach(dataset.frame)
@@ -0,0 +1,117 @@
+# startup_timing.py
+'''Cold-start timing of every page.
+
+Each page runs in a fresh interpreter through streamlit's AppTest, the way a
+new server process would first render it, with `-X importtime` to account
+for every module the run imports. Streamlit itself is imported before the
+measurement starts, as the server has it loaded before running main.py.
+
+For each page it reports the wall time of the first run (for data pages this
+includes loading the example dataset), the time spent importing modules during
+that run, and which of the heavy libraries got imported.
+
+    python startup_timing.py
+    python startup_timing.py --pages Home "Advanced EDA" --repeat 3 --json
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PAGES = ["Home", "Data Exploration", "Data Preprocessing", "Advanced EDA"]
+
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "seaborn", "plotly", "scipy", "sklearn", "pyarrow"]
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+MARKER = "startup_timing: app run starts"
+
+# Runs in the child interpreter. The navigation menu is a custom component that
+# AppTest cannot click, so it is replaced by a function returning the page.
+CHILD = r'''
+import json, sys, time
+import streamlit_option_menu
+streamlit_option_menu.option_menu = lambda *args, **kwargs: {page!r}
+from streamlit.testing.v1 import AppTest
+
+before = set(sys.modules)
+print({marker!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+app = AppTest.from_file({main!r}, default_timeout={timeout})
+app.run()
+if {page!r} != "Home":
+    app.sidebar.button[0].click().run()  # "Load Example Titanic Dataset"
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split(".")[0] for name in set(sys.modules) - before}})
+print(json.dumps({{"seconds": elapsed, "modules": loaded, "errors": [str(e.value) for e in app.exception]}}))
+'''
+
+
+def import_seconds(stderr: str) -> float:
+    """Sum the self time of the imports logged by -X importtime after the marker."""
+    total, started = 0, False
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            started = True
+        elif started and line.startswith("import time:") and "|" in line:
+            self_us = line.split(":", 1)[1].split("|")[0].strip()
+            if self_us.isdigit():
+                total += int(self_us)
+    return total / 1e6
+
+
+def time_page(page: str, timeout: float = 120) -> dict:
+    """Run one page in a fresh interpreter and return its timings."""
+    code = CHILD.format(page=page, marker=MARKER, main=MAIN, timeout=timeout)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(MAIN))
+    if result.returncode != 0:
+        raise RuntimeError(f"{page}: child process failed\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "page": page,
+        "seconds": report["seconds"],
+        "import_seconds": import_seconds(result.stderr),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in report["modules"]],
+        "errors": report["errors"],
+    }
+
+
+def run(pages=PAGES, repeat: int = 1) -> list:
+    """Time every page `repeat` times; each entry holds the median of the runs."""
+    results = []
+    for page in pages:
+        runs = [time_page(page) for _ in range(repeat)]
+        results.append({
+            "page": page,
+            "seconds": statistics.median(r["seconds"] for r in runs),
+            "import_seconds": statistics.median(r["import_seconds"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+            "errors": runs[-1]["errors"],
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start time per page.")
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--repeat", type=int, default=1, help="fresh runs per page, the median is reported")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    results = run(args.pages, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'Page':<20} {'First run (s)':>14} {'Imports (s)':>12}  Heavy libraries imported")
+    for r in results:
+        print(f"{r['page']:<20} {r['seconds']:>14.2f} {r['import_seconds']:>12.2f}  {', '.join(r['heavy_modules']) or '-'}")
+        for error in r["errors"]:
+            print(f"    error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# time_series.py
+'''Datetime detection at load time and server-side time-series aggregation.
+
+Detection looks at an evenly spaced sample of every text column, guesses
+candidate formats from a few of its values (month-first and day-first, since
+a value like 01/02/2024 fits both), parses the sample with each explicit
+format and keeps the one that parses most of it; a column is converted only
+when the whole column then parses (one vectorized pass, no value lost).
+
+Aggregation works on the sorted int64 nanosecond timestamps of a column: bin
+edges are located with one searchsorted call and per-bin count/sum/mean/
+min/max come from ufunc.reduceat, so the cost is one pass over the events and
+only the resampled points (at most MAX_POINTS) are sent to a chart. Gaps are
+the differences between consecutive sorted timestamps above a threshold.
+Timezone-aware columns are binned in UTC.
+'''
+from __future__ import annotations
+
+import math
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+DATETIME_SAMPLE_ROWS = 1000
+
+# Share of the sample that must parse before the whole column is tried.
+DATETIME_MIN_PARSED = 0.95
+
+# Sampled values a datetime format is guessed from.
+FORMAT_GUESSES = 10
+
+NS = {"Second": 10**9, "Minute": 60 * 10**9, "Hour": 3600 * 10**9, "Day": 86400 * 10**9, "Week": 7 * 86400 * 10**9}
+
+# Most points a resampled series has; finer bins are widened to stay under it.
+MAX_POINTS = 5000
+
+MAX_GAPS = 100
+
+AGGREGATIONS = ["count", "sum", "mean", "min", "max"]
+
+_NAT = -2**63  # NaT as int64 nanoseconds
+
+
+def _is_date_format(fmt) -> bool:
+    return fmt is not None and ("%H" in fmt or (any(code in fmt for code in ("%Y", "%y"))
+                                                and any(code in fmt for code in ("%m", "%b", "%B"))))
+
+
+def _candidate_formats(sample: pd.Series) -> list:
+    values = sample.iloc[np.unique(np.linspace(0, len(sample) - 1, min(len(sample), FORMAT_GUESSES)).astype(int))]
+    formats = []
+    for value in values:
+        for dayfirst in (False, True):
+            fmt = pd.tseries.api.guess_datetime_format(value, dayfirst=dayfirst)
+            if _is_date_format(fmt) and fmt not in formats:
+                formats.append(fmt)
+    return formats
+
+
+def detect_datetime_columns(df: pd.DataFrame, sample_rows: int = DATETIME_SAMPLE_ROWS) -> dict:
+    """Return {column: format} for the text columns whose sampled values parse as datetimes."""
+    found = {}
+    positions = np.unique(np.linspace(0, max(len(df) - 1, 0), min(len(df), sample_rows)).astype(int))
+    for column in df.select_dtypes(include=["object", "string"]).columns:
+        sample = df[column].iloc[positions].dropna()
+        sample = sample[sample.map(type) == str] if len(sample) else sample
+        if sample.empty:
+            continue
+        best, best_parsed = None, 0.0
+        for fmt in _candidate_formats(sample):
+            parsed = pd.to_datetime(sample, format=fmt, errors="coerce", utc="%z" in fmt).notna().mean()
+            if parsed > best_parsed:
+                best, best_parsed = fmt, parsed
+        if best is not None and best_parsed >= DATETIME_MIN_PARSED:
+            found[column] = best
+    return found
+
+
+def convert_datetime_columns(df: pd.DataFrame) -> list:
+    """Parse the detected datetime columns of df in place; return the converted names.
+
+    A column stays text if any of its values does not parse with the format.
+    """
+    converted = []
+    for column, fmt in detect_datetime_columns(df).items():
+        parsed = pd.to_datetime(df[column], format=fmt, errors="coerce", utc="%z" in fmt)
+        if parsed.isna().sum() == df[column].isna().sum():
+            df[column] = parsed
+            converted.append(column)
+    return converted
+
+
+def time_order(times: pd.Series):
+    """Return (sorted int64 ns timestamps without NaT, their row positions)."""
+    ns = pd.DatetimeIndex(times).as_unit("ns").asi8
+    positions = np.flatnonzero(ns != _NAT)
+    ns = ns[positions]
+    if len(ns) > 1 and not (ns[1:] >= ns[:-1]).all():
+        order = np.argsort(ns, kind="stable")
+        ns, positions = ns[order], positions[order]
+    return ns, positions
+
+
+def bin_width(sorted_ns: np.ndarray, unit: str) -> int:
+    """Width in ns of `unit` bins, widened to a multiple so there are at most MAX_POINTS bins."""
+    width = NS[unit]
+    if len(sorted_ns) == 0:
+        return width
+    bins = (sorted_ns[-1] // width) - (sorted_ns[0] // width) + 1
+    return width * max(1, math.ceil(bins / MAX_POINTS))
+
+
+def resample(sorted_ns: np.ndarray, values=None, width: int = NS["Hour"]) -> pd.DataFrame:
+    """Aggregate events per bin of `width` ns.
+
+    `values` are aligned with sorted_ns (NaN ignored); without them only the
+    event count is returned. Empty bins are kept with count 0.
+    """
+    if len(sorted_ns) == 0:
+        return pd.DataFrame(columns=["count"] + ([] if values is None else AGGREGATIONS[1:]))
+    start = sorted_ns[0] // width * width
+    edges = start + np.arange((sorted_ns[-1] - start) // width + 1) * width
+    bounds = np.searchsorted(sorted_ns, edges, side="left")
+    index = pd.to_datetime(edges, unit="ns")
+    events = np.diff(np.append(bounds, len(sorted_ns)))
+    if values is None:
+        return pd.DataFrame({"count": events}, index=index)
+
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    count = np.add.reduceat(valid.astype(np.int64), bounds)
+    total = np.add.reduceat(np.where(valid, values, 0.0), bounds)
+    low = np.minimum.reduceat(np.where(valid, values, np.inf), bounds)
+    high = np.maximum.reduceat(np.where(valid, values, -np.inf), bounds)
+    # reduceat returns the element at the bound for bins without events; reset those.
+    count[events == 0] = 0
+    empty = count == 0
+    total[empty] = 0.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    frame = pd.DataFrame({"count": count, "sum": total, "mean": mean, "min": low, "max": high}, index=index)
+    frame.loc[empty, ["mean", "min", "max"]] = np.nan
+    return frame
+
+
+def rolling(series: pd.Series, window: int, how: str = "mean") -> pd.Series:
+    """Rolling aggregate over `window` bins of a resampled series."""
+    return getattr(series.rolling(window, min_periods=1), how)()
+
+
+def find_gaps(sorted_ns: np.ndarray, min_gap: int, limit: int = MAX_GAPS):
+    """Return (number of gaps longer than min_gap ns, the `limit` longest as a frame)."""
+    if len(sorted_ns) < 2:
+        return 0, pd.DataFrame(columns=["Gap start", "Gap end", "Duration"])
+    gaps = np.diff(sorted_ns)
+    found = np.flatnonzero(gaps > min_gap)
+    longest = found[np.argsort(gaps[found], kind="stable")[::-1][:limit]]
+    frame = pd.DataFrame({
+        "Gap start": pd.to_datetime(sorted_ns[longest], unit="ns"),
+        "Gap end": pd.to_datetime(sorted_ns[longest + 1], unit="ns"),
+        "Duration": pd.to_timedelta(gaps[longest], unit="ns"),
+    })
+    return len(found), frame
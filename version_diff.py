@@ -0,0 +1,297 @@
+# version_diff.py
+'''Checksum-based comparison of two dataset versions.
+
+Every version keeps VersionChecksums in its profile:
+
+- one uint64 hash per row, the sum of the per-column value hashes salted with
+  the column name (index excluded), and
+- per column, the wrapping sum of its value hashes over blocks of BLOCK_ROWS
+  rows.
+
+They are computed once when a dataset is loaded (once per shared dataset,
+see shared_datasets.py) and carried forward by preprocessing steps: a column
+step rehashes only the columns it declares changed (adjusting
+the row hashes by the difference), a row-removing step just selects the
+surviving row hashes. Comparing two versions then finds the changed rows by
+comparing row hashes, skips every column whose block checksums match, and
+compares actual cell values only for the changed rows of the remaining
+columns, so the work grows with what changed rather than with rows x columns.
+
+Equal hashes are taken to mean equal values (64-bit hashes, collisions are
+negligible). Rows are matched by index label.
+'''
+from __future__ import annotations
+
+from collections import namedtuple
+
+import streamlit as st
+
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+BLOCK_ROWS = 4096
+
+# Changed cells shown per column in the sampled cell diff, and overall.
+SAMPLE_CELLS_PER_COLUMN = 20
+MAX_SAMPLE_CELLS = 500
+
+# summary: dict of headline counts; columns: status and changed cells per
+# column; shifts: before/after statistics of changed columns; cells: sampled
+# (row, column, before, after) changes.
+VersionDiff = namedtuple("VersionDiff", ["summary", "columns", "shifts", "cells"])
+
+
+def hash_column(series: pd.Series) -> np.ndarray:
+    """Return one uint64 hash per value (NaN hashes equal to NaN)."""
+    try:
+        return pd.util.hash_pandas_object(series, index=False).to_numpy()
+    except TypeError:
+        # Unhashable objects such as lists: hash their text form.
+        return pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+
+
+def _salted(hashes: np.ndarray, name) -> np.ndarray:
+    salt = pd.util.hash_array(np.array([str(name)], dtype=object))[0] | np.uint64(1)
+    return hashes * salt
+
+
+def block_sums(hashes: np.ndarray) -> np.ndarray:
+    """Return the wrapping sum of the hashes of every BLOCK_ROWS rows."""
+    if not len(hashes):
+        return np.zeros(0, dtype=np.uint64)
+    return np.add.reduceat(hashes, np.arange(0, len(hashes), BLOCK_ROWS))
+
+
+class VersionChecksums:
+    """Row hashes and per-column block checksums of one dataset version.
+
+    Loaded datasets get them from of(); versions derived from a step carry
+    them over, and anything missing is filled on first use.
+    """
+
+    def __init__(self):
+        self.rows = None  # pd.Series of uint64 row hashes indexed like the frame
+        self.blocks = {}  # column -> block checksums
+
+    @classmethod
+    def of(cls, df: pd.DataFrame) -> "VersionChecksums":
+        """Compute the row hashes and every column's block checksums of a loaded frame."""
+        checksums = cls()
+        checksums.row_hashes(df)
+        return checksums
+
+    def row_hashes(self, df: pd.DataFrame) -> pd.Series:
+        if self.rows is None or len(self.rows) != len(df):
+            total = np.zeros(len(df), dtype=np.uint64)
+            for name in df.columns:
+                hashes = hash_column(df[name])
+                self.blocks.setdefault(name, block_sums(hashes))
+                total += _salted(hashes, name)
+            self.rows = pd.Series(total, index=df.index)
+        return self.rows
+
+    def column_blocks(self, df: pd.DataFrame, name) -> np.ndarray:
+        if name not in self.blocks:
+            self.blocks[name] = block_sums(hash_column(df[name]))
+        return self.blocks[name]
+
+    def derive(self, old_df, new_df, columns=None, renamed=None, rows=False) -> "VersionChecksums":
+        """Return the checksums of `new_df`, produced from `old_df` by a preprocessing step.
+
+        Arguments mean the same as in DatasetProfile.derive.
+        """
+        result = VersionChecksums()
+        if not (columns or renamed or rows) or old_df is None:
+            return result
+
+        if rows:
+            # Same values, fewer rows: pick the surviving row hashes by label.
+            if self.rows is not None and self.rows.index.is_unique and not (columns or renamed):
+                positions = self.rows.index.get_indexer(new_df.index)
+                if (positions >= 0).all():
+                    result.rows = pd.Series(self.rows.to_numpy()[positions], index=new_df.index)
+            return result
+
+        renamed = renamed or {}
+        original = {new: old for old, new in renamed.items()}
+        changed = set(columns or [])
+        changed |= {name for name in old_df.columns
+                    if name in new_df.columns and old_df[name].dtype != new_df[name].dtype}
+
+        for name, blocks in self.blocks.items():
+            if name not in changed and renamed.get(name, name) in new_df.columns:
+                result.blocks[renamed.get(name, name)] = blocks
+
+        if self.rows is not None and len(self.rows) == len(new_df):
+            total = self.rows.to_numpy().copy()
+            for name in old_df.columns:
+                if name in changed or name in renamed or name not in new_df.columns:
+                    total -= _salted(hash_column(old_df[name]), name)
+            for name in new_df.columns:
+                if name in changed or name in original or name not in old_df.columns:
+                    hashes = hash_column(new_df[name])
+                    result.blocks[name] = block_sums(hashes)
+                    total += _salted(hashes, name)
+            result.rows = pd.Series(total, index=new_df.index)
+        return result
+
+
+def _cells_changed(before: pd.Series, after: pd.Series) -> np.ndarray:
+    """Elementwise 'value differs' with NaN equal to NaN, for series of equal length."""
+    before = before.reset_index(drop=True)
+    after = after.reset_index(drop=True)
+    if isinstance(before.dtype, pd.CategoricalDtype) or isinstance(after.dtype, pd.CategoricalDtype):
+        before, after = before.astype(object), after.astype(object)
+    same = before.eq(after) | (before.isna() & after.isna())
+    return ~same.to_numpy(dtype=bool)
+
+
+def _distribution_shift(name, old_df, new_df, old_profile, new_profile) -> dict:
+    before, after = old_profile.column(old_df, name), new_profile.column(new_df, name)
+    shift = {
+        "Column": name,
+        "Missing before": before.missing, "Missing after": after.missing,
+        "Distinct before": before.nunique, "Distinct after": after.nunique,
+        "Mean before": before.mean, "Mean after": after.mean,
+        "Std before": before.std if before.numeric else None, "Std after": after.std if after.numeric else None,
+        "Value shift (TVD)": None,
+    }
+    counts_before, counts_after = before.counts(dropna=False), after.counts(dropna=False)
+    if counts_before is not None and counts_after is not None and before.rows and after.rows:
+        # Total variation distance between the two value distributions.
+        p = (counts_before / before.rows).astype(float)
+        q = (counts_after / after.rows).astype(float)
+        shift["Value shift (TVD)"] = float(p.sub(q, fill_value=0).abs().sum() / 2)
+    return shift
+
+
+def diff_versions(old_df: pd.DataFrame, new_df: pd.DataFrame, old_checksums=None, new_checksums=None,
+                  old_profile=None, new_profile=None, seed: int = 0) -> VersionDiff:
+    """Compare two versions of a dataset.
+
+    Checksums and profiles are the versions' cached ones (see DatasetProfile);
+    without them they are computed here.
+    """
+    from column_profile import DatasetProfile
+
+    old_checksums = old_checksums or VersionChecksums()
+    new_checksums = new_checksums or VersionChecksums()
+    old_profile = old_profile or DatasetProfile()
+    new_profile = new_profile or DatasetProfile()
+    rng = np.random.default_rng(seed)
+
+    # ---- columns ----
+    removed = [name for name in old_df.columns if name not in new_df.columns]
+    added = [name for name in new_df.columns if name not in old_df.columns]
+    renamed = {}
+    if len(old_df) == len(new_df) and old_df.index.equals(new_df.index):
+        for old_name in removed:
+            old_blocks = old_checksums.column_blocks(old_df, old_name)
+            for new_name in added:
+                if new_name not in renamed.values() and \
+                        np.array_equal(old_blocks, new_checksums.column_blocks(new_df, new_name)):
+                    renamed[old_name] = new_name
+                    break
+    common = [name for name in new_df.columns if name in old_df.columns]
+
+    # ---- rows ----
+    old_rows = old_checksums.row_hashes(old_df)
+    new_rows = new_checksums.row_hashes(new_df)
+    aligned = old_df.index.equals(new_df.index)
+    if not aligned and not (old_df.index.is_unique and new_df.index.is_unique):
+        raise ValueError("Versions with duplicate index labels cannot be matched row by row.")
+
+    if aligned:
+        rows_added = rows_removed = 0
+        old_common = new_common = np.arange(len(new_df))
+    else:
+        rows_removed = len(old_df.index.difference(new_df.index))
+        rows_added = len(new_df.index.difference(old_df.index))
+        labels = new_df.index.intersection(old_df.index)
+        old_common, new_common = old_df.index.get_indexer(labels), new_df.index.get_indexer(labels)
+
+    # Row hashes over the shared columns only: take out the columns one side lacks.
+    old_hashes, new_hashes = old_rows.to_numpy()[old_common], new_rows.to_numpy()[new_common]
+    for name in removed:
+        old_hashes = old_hashes - _salted(hash_column(old_df[name].iloc[old_common]), name)
+    for name in added:
+        new_hashes = new_hashes - _salted(hash_column(new_df[name].iloc[new_common]), name)
+    changed = np.flatnonzero(old_hashes != new_hashes)
+    old_changed, new_changed = old_common[changed], new_common[changed]
+
+    # ---- cells ----
+    column_rows, cells = [], []
+    for name in common:
+        old_positions, new_positions = old_changed, new_changed
+        if aligned and len(changed) and name in old_checksums.blocks and name in new_checksums.blocks:
+            differs = np.flatnonzero(old_checksums.blocks[name] != new_checksums.blocks[name])
+            keep = np.isin(new_changed // BLOCK_ROWS, differs)
+            old_positions, new_positions = old_changed[keep], new_changed[keep]
+
+        before = old_df[name].iloc[old_positions]
+        after = new_df[name].iloc[new_positions]
+        mask = _cells_changed(before, after) if len(old_positions) else np.zeros(0, dtype=bool)
+        count = int(mask.sum())
+        dtype_changed = old_df[name].dtype != new_df[name].dtype
+        status = "changed" if count else ("retyped" if dtype_changed else "unchanged")
+        column_rows.append([name, status, str(old_df[name].dtype), str(new_df[name].dtype), count])
+
+        hits = np.flatnonzero(mask)
+        if len(hits) and len(cells) < MAX_SAMPLE_CELLS:
+            take = min(len(hits), SAMPLE_CELLS_PER_COLUMN, MAX_SAMPLE_CELLS - len(cells))
+            for hit in np.sort(rng.choice(hits, take, replace=False)):
+                cells.append([new_df.index[new_positions[hit]], name, before.iloc[hit], after.iloc[hit]])
+
+    for name in removed:
+        if name in renamed:
+            column_rows.append([f"{name} -> {renamed[name]}", "renamed", str(old_df[name].dtype),
+                                str(new_df[renamed[name]].dtype), 0])
+        else:
+            column_rows.append([name, "removed", str(old_df[name].dtype), None, None])
+    for name in added:
+        if name not in renamed.values():
+            column_rows.append([name, "added", None, str(new_df[name].dtype), None])
+    columns = pd.DataFrame(column_rows, columns=["Column", "Status", "Type before", "Type after", "Changed cells"])
+
+    shifted = columns.loc[columns["Status"].isin(["changed", "retyped"]), "Column"]
+    shifts = pd.DataFrame([_distribution_shift(name, old_df, new_df, old_profile, new_profile) for name in shifted])
+    cells = pd.DataFrame(cells, columns=["Row", "Column", "Before", "After"]).astype({"Before": object, "After": object})
+
+    summary = {
+        "Rows before": len(old_df),
+        "Rows after": len(new_df),
+        "Rows added": rows_added,
+        "Rows removed": rows_removed,
+        "Rows changed": len(changed),
+        "Columns added": len(added) - len(renamed),
+        "Columns removed": len(removed) - len(renamed),
+        "Columns renamed": len(renamed),
+        "Columns changed": int((columns["Status"] == "changed").sum()),
+    }
+    return VersionDiff(summary, columns, shifts, cells)
+
+
+# -----------------------------
+# Streamlit rendering
+# -----------------------------
+
+def show_version_diff(diff: VersionDiff):
+    """Render the result of diff_versions."""
+    st.dataframe(pd.DataFrame([diff.summary]), hide_index=True)
+
+    only_changes = st.toggle("Only changed columns", value=True, key="version_diff_only_changes")
+    columns = diff.columns[diff.columns["Status"] != "unchanged"] if only_changes else diff.columns
+    st.markdown("**Columns**")
+    st.dataframe(columns, hide_index=True)
+
+    if not diff.shifts.empty:
+        st.markdown("**Distribution shifts**")
+        st.dataframe(diff.shifts, hide_index=True)
+
+    if not diff.cells.empty:
+        st.markdown(f"**Sampled cell changes** (up to {SAMPLE_CELLS_PER_COLUMN} per column)")
+        st.dataframe(diff.cells.astype({"Before": str, "After": str}), hide_index=True)
+    elif not diff.summary["Rows changed"]:
+        st.info("No cell values changed in the rows both versions share.")